@@ -19,32 +19,43 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    # main раньше staticfiles: его collectstatic собирает Tailwind CSS перед копированием статики
     'main.apps.MainConfig',
+    'django.contrib.staticfiles',
     'django_json_widget',
     'ckeditor',
     'ckeditor_uploader',
 ]
 
 MIDDLEWARE = [
+    'main.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
+    'main.middleware.LanguageQueryMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.DatabaseLockedMiddleware',
 ]
 
 ROOT_URLCONF = 'digitalem_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендеринга для main.middleware.RequestMetricsMiddleware
+        'BACKEND': 'main.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Скомпилированные шаблоны хранятся в памяти процесса; runserver сбрасывает их при изменении файлов
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -64,6 +75,86 @@ DATABASES = {
     }
 }
 
+# Профиль SQLite для продакшена (SQLITE_PRODUCTION=True): WAL, чтобы запись из админки не блокировала
+# чтение, прагмы на каждом новом соединении и постоянные соединения с проверкой перед запросом.
+SQLITE_PRODUCTION_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA cache_size=-20000;'
+        'PRAGMA mmap_size=134217728;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    # Транзакция сразу берёт блокировку записи: ожидание идёт по timeout, а не ошибкой посреди транзакции
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 5,
+}
+if os.getenv('SQLITE_PRODUCTION') == 'True':
+    DATABASES['default'].update({
+        'OPTIONS': SQLITE_PRODUCTION_OPTIONS,
+        # Под ASGI каждый запрос идёт в своём потоке, постоянные соединения там копились бы по потокам
+        'CONN_MAX_AGE': 0 if os.getenv('ASYNC_VIEWS') == 'True' else 600,
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# Снимок базы для публичных страниц (READ_SNAPSHOT=True): GET-запросы main.views читают из копии,
+# открытой только для чтения с immutable=1, запись из админки и формы идёт в основную базу.
+# Снимок публикует manage.py publish_snapshot или сохранение контента (SNAPSHOT_PUBLISH_ON_SAVE).
+SNAPSHOT_PATH = Path(os.getenv('SNAPSHOT_PATH', BASE_DIR / 'db.snapshot.sqlite3'))
+SNAPSHOT_PUBLISH_ON_SAVE = os.getenv('SNAPSHOT_PUBLISH_ON_SAVE', 'True') == 'True'
+
+if os.getenv('READ_SNAPSHOT') == 'True':
+    DATABASES['snapshot'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'{SNAPSHOT_PATH.as_uri()}?mode=ro&immutable=1',
+        # Соединение на запрос: постоянное соединение продолжало бы читать заменённый файл
+        'CONN_MAX_AGE': 0,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['main.snapshot.SnapshotRouter']
+
+# Retry-After (сек.) для ответа 503, когда SQLite занят записью (main.middleware.DatabaseLockedMiddleware)
+DATABASE_LOCKED_RETRY_AFTER = 2
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', BASE_DIR / 'cache'),
+        # Страницы на трёх языках, ленты, карты сайта и ответы API: при переполнении FileBasedCache
+        # удаляет случайную треть файлов, поэтому запас с учётом роста контента
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 20000))},
+    },
+    # Фрагменты base.html ({% cache ... using="fragments" %}): зависят только от языка, шаблонов,
+    # переводов и статики, которые меняются с деплоем, а он перезапускает воркеры — поэтому в памяти и без срока
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'TIMEOUT': None,
+    },
+}
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Публичные страницы в async-варианте (main/async_views.py) для запуска под ASGI, см. run_gunicorn_asgi.sh
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS') == 'True'
+
+# Замеры запросов (main.middleware.RequestMetricsMiddleware): Server-Timing для сотрудников и /metrics
+# для Prometheus. Каждый воркер сбрасывает свои значения в METRICS_DIR не чаще раза в
+# METRICS_FLUSH_INTERVAL секунд. С METRICS_TOKEN /metrics требует "Authorization: Bearer <token>",
+# без него открыт только сотрудникам. Включаются явно, как и остальные профили: REQUEST_METRICS=True.
+REQUEST_METRICS = os.getenv('REQUEST_METRICS') == 'True'
+METRICS_DIR = Path(os.getenv('METRICS_DIR', BASE_DIR / 'metrics'))
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# manage.py prerender: публичные страницы на всех языках в PRERENDER_ROOT/<язык>/<путь>/index.html для nginx.
+# PRERENDER_BASE_URL — адрес сайта для абсолютных ссылок (по умолчанию https://<первый из ALLOWED_HOSTS>).
+# С PRERENDER_ON_SAVE сохранение в админке после коммита перерисовывает затронутые страницы
+PRERENDER_ROOT = Path(os.getenv('PRERENDER_ROOT', BASE_DIR / 'prerendered'))
+PRERENDER_BASE_URL = os.getenv('PRERENDER_BASE_URL', '')
+PRERENDER_ON_SAVE = os.getenv('PRERENDER_ON_SAVE') == 'True'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -103,6 +194,24 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic пишет файлы с хешем содержимого в имени (css/style.<hash>.css, манифест staticfiles.json)
+# и сжатые копии .gz/.br текстовых файлов; {% static %} ссылается на имена с хешем
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'main.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Раздавать /static/ из Django (main.staticfiles.serve_static), если перед приложением нет nginx
+# с gzip_static и долгим кэшем: сжатые копии по Accept-Encoding, Range, Cache-Control immutable
+SERVE_STATIC = os.getenv('SERVE_STATIC') == 'True'
+
+# Команда запуска Tailwind CLI для manage.py build_css (standalone-бинарник или, например, "npx tailwindcss@3")
+TAILWIND_CLI = os.getenv('TAILWIND_CLI', 'tailwindcss')
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -121,3 +230,4 @@ CKEDITOR_UPLOAD_PATH = "uploads/"
 
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org/bot')
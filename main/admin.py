@@ -1,19 +1,206 @@
+from ckeditor_uploader.fields import RichTextUploadingField, RichTextUploadingFormField
+from ckeditor_uploader.widgets import CKEditorUploadingWidget
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import models
+from django.forms.models import BaseInlineFormSet
+from django.http import QueryDict
+from django.utils import timezone
+from .search import match_expression, matching_ids
 from .models import (
     TeamMember, Project, ProjectFeature,
-    ProjectTechStack, SocialLink, Service, Publication, ProjectResultImage, News
+    ProjectTechStack, SocialLink, Service, Publication, ProjectResultImage, News, ContactMessage
 )
 
 
+def text_columns(model, prefix='', exclude=()):
+    # TextField-колонки (rich-text, обработанный HTML, анонсы): самые тяжёлые в строке
+    return [f"{prefix}{field.name}" for field in model._meta.concrete_fields
+            if isinstance(field, models.TextField) and field.name not in exclude]
+
+
+class FullTextSearchMixin:
+    # Поиск через индекс FTS5 (main/search.py) вместо LIKE '%...%' по всем rich-text колонкам;
+    # используется и автодополнением autocomplete_fields
+    def get_search_results(self, request, queryset, search_term):
+        if not match_expression(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=matching_ids(self.model, search_term)), False
+
+
+class DeferredTextChangeList(ChangeList):
+    # Список не читает TextField-колонки, которых нет в list_display, — ни своих, ни из list_select_related
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        columns = text_columns(self.model, exclude=self.list_display)
+        if isinstance(self.list_select_related, (list, tuple)):
+            for name in self.list_select_related:
+                columns += text_columns(self.model._meta.get_field(name).related_model, prefix=f"{name}__")
+        return queryset.defer(*columns)
+
+
+class DeferredTextMixin:
+    def get_changelist(self, request, **kwargs):
+        return DeferredTextChangeList
+
+
+class AutocompleteListFilter(admin.RelatedFieldListFilter):
+    """
+    Фильтр по связи без списка всех связанных объектов: только выбранный и поле с автодополнением
+    (запросы те же, что у autocomplete_fields; у админки связанной модели должны быть search_fields).
+    """
+    template = 'admin/main/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.model_admin = model_admin
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        if not self.lookup_val:
+            return []
+        try:
+            return field.get_choices(include_blank=False,
+                                     limit_choices_to={f"{field.target_field.name}__in": self.lookup_val})
+        except (ValueError, ValidationError):
+            # Неверное значение в адресе: ChangeList сам ответит на него как на ошибку фильтра
+            return []
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        self.query_string = changelist.get_query_string(remove=self.expected_parameters())
+        widget = AutocompleteSelect(self.field, self.model_admin.admin_site, attrs={'style': 'width: 100%'})
+        formfield = self.field.formfield(widget=widget, required=False)
+        self.rendered_widget = formfield.widget.render(self.lookup_kwarg, None, attrs={'id': f"id_filter_{self.field_path}"})
+        yield from super().choices(changelist)
+
+    @staticmethod
+    def media(model_admin, field_name):
+        widget = AutocompleteSelect(model_admin.model._meta.get_field(field_name), model_admin.admin_site)
+        return widget.media + forms.Media(js=['js/admin_autocomplete_filter.js'])
+
+
+class LazyCKEditorWidget(CKEditorUploadingWidget):
+    # Редактор создаётся при первом фокусе на поле (static/js/admin_lazy_ckeditor.js), а не при загрузке страницы
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('template_name', 'admin/main/widgets/lazy_ckeditor.html')
+        super().__init__(*args, **kwargs)
+
+    @property
+    def media(self):
+        return super().media + forms.Media(js=['js/admin_lazy_ckeditor.js'])
+
+
+class LazyRichTextFormField(RichTextUploadingFormField):
+    widget = LazyCKEditorWidget
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    # Подпись выбранного объекта передаёт набор форм (labels); без неё AutocompleteSelect запрашивает её сам
+    labels = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = [str(v) for v in value if str(v) not in self.choices.field.empty_values]
+        if self.labels is None or any(pk not in self.labels for pk in selected):
+            return super().optgroups(name, value, attr)
+        options = [] if self.is_required else [self.create_option(name, '', '', False, 0)]
+        for pk in selected:
+            options.append(self.create_option(name, pk, self.labels[pk], True, len(options)))
+        return [(None, options, 0)]
+
+
+class ParentCachingInlineFormSet(BaseInlineFormSet):
+    """
+    Формы получают уже загруженный родительский объект, а автодополнения — подписи объектов,
+    загруженных с select_related: ни __str__ строк (self.project.title_ru), ни виджеты не ходят в базу.
+    """
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        setattr(form.instance, self.fk.name, self.instance)
+        for name, field in form.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, PreloadedAutocompleteSelect) and form.instance.pk is not None:
+                related = getattr(form.instance, name)
+                widget.labels = {} if related is None else {str(related.pk): field.label_from_instance(related)}
+        return form
+
+
+class PaginatedInlineFormSet(ParentCachingInlineFormSet):
+    # Номер страницы — в параметре <prefix>-page адреса формы; POST уходит на тот же адрес и ту же страницу
+    per_page = 20
+    query = QueryDict()
+
+    @property
+    def page_param(self):
+        return f"{self.prefix}-page"
+
+    def get_queryset(self):
+        if not hasattr(self, 'page'):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = paginator.get_page(self.query.get(self.page_param))
+            self.page.object_list = list(self.page.object_list)
+        return self.page.object_list
+
+    def page_links(self):
+        self.get_queryset()
+        links = []
+        for number in self.page.paginator.get_elided_page_range(self.page.number):
+            url = None
+            if number not in (self.page.number, self.page.paginator.ELLIPSIS):
+                query = self.query.copy()
+                query[self.page_param] = number
+                url = f"?{query.urlencode()}"
+            links.append((number, url))
+        return links
+
+
+class ScalableInlineMixin:
+    """
+    Вложенный набор для связей на сотни строк: по per_page форм на странице, автодополнения без запроса
+    на каждую форму и CKEditor, который создаётся только у редактируемого поля.
+    """
+    formset = PaginatedInlineFormSet
+    template = 'admin/main/edit_inline/paginated_stacked.html'
+    per_page = 20
+    formfield_overrides = {RichTextUploadingField: {'form_class': LazyRichTextFormField}}
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        for name in self.autocomplete_fields:
+            related_model = self.model._meta.get_field(name).related_model
+            queryset = queryset.select_related(name).defer(*text_columns(related_model, prefix=f"{name}__"))
+        return queryset
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.query = request.GET
+        return formset
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', PreloadedAutocompleteSelect(db_field, self.admin_site, using=kwargs.get('using')))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
 class SocialLinkInline(admin.TabularInline):
     model = SocialLink
+    formset = ParentCachingInlineFormSet
     extra = 1
     fields = ('icon_class', 'url')
 
 
-class PublicationInline(admin.StackedInline):
+class PublicationInline(ScalableInlineMixin, admin.StackedInline):
     model = Publication
     extra = 0
+    classes = ('collapse',)
+    ordering = ('-publication_date', 'title_ru', '-id')
     fields = (
         ('title_ru', 'title_kk', 'title_en'),
         'source',
@@ -27,24 +214,27 @@ class PublicationInline(admin.StackedInline):
 
 class ProjectResultImageInline(admin.TabularInline):
     model = ProjectResultImage
+    formset = ParentCachingInlineFormSet
     extra = 1
     fields = ('image', 'caption_ru', 'caption_kk', 'caption_en')
 
 
 class ProjectFeatureInline(admin.TabularInline):
     model = ProjectFeature
+    formset = ParentCachingInlineFormSet
     extra = 1
     fields = ('icon_class', 'text_ru', 'text_kk', 'text_en', 'order')
 
 
 class ProjectTechStackInline(admin.TabularInline):
     model = ProjectTechStack
+    formset = ParentCachingInlineFormSet
     extra = 1
     fields = ('icon_class', 'text', 'order')
 
 
 @admin.register(TeamMember)
-class TeamMemberAdmin(admin.ModelAdmin):
+class TeamMemberAdmin(DeferredTextMixin, admin.ModelAdmin):
     list_display = ('name_ru', 'position_ru', 'is_visible')
     search_fields = ('name_ru', 'name_kk', 'name_en')
     prepopulated_fields = {'slug': ('name_ru',)}
@@ -73,11 +263,11 @@ class TeamMemberAdmin(admin.ModelAdmin):
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(DeferredTextMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('title_ru', 'category', 'slug')
     list_filter = ('category',)
     prepopulated_fields = {'slug': ('title_ru',)}
-    filter_horizontal = ('team',)
+    autocomplete_fields = ['team']
     inlines = [ProjectFeatureInline, ProjectTechStackInline, ProjectResultImageInline]
     search_fields = ('title_ru', 'keywords')
 
@@ -118,9 +308,10 @@ class ProjectAdmin(admin.ModelAdmin):
 
 
 @admin.register(News)
-class NewsAdmin(admin.ModelAdmin):
+class NewsAdmin(DeferredTextMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('title_ru', 'category', 'published_date', 'project', 'author_name')
-    list_filter = ('category', 'published_date', 'project')
+    list_filter = ('category', 'published_date', ('project', AutocompleteListFilter))
+    list_select_related = ('project',)
     search_fields = ('title_ru', 'content_ru', 'keywords')
     prepopulated_fields = {'slug': ('title_ru',)}
     autocomplete_fields = ['project']
@@ -140,9 +331,13 @@ class NewsAdmin(admin.ModelAdmin):
         }),
     )
 
+    @property
+    def media(self):
+        return super().media + AutocompleteListFilter.media(self, 'project')
+
 
 @admin.register(Service)
-class ServiceAdmin(admin.ModelAdmin):
+class ServiceAdmin(DeferredTextMixin, admin.ModelAdmin):
     list_display = ('title_ru', 'order')
     list_editable = ('order',)
     fieldsets = (
@@ -155,4 +350,19 @@ class ServiceAdmin(admin.ModelAdmin):
         ('Описание (3 языка)', {
             'fields': ('description_ru', 'description_kk', 'description_en')
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(ContactMessage)
+class ContactMessageAdmin(DeferredTextMixin, admin.ModelAdmin):
+    list_display = ('name', 'email', 'phone', 'created_at', 'status', 'attempts')
+    list_filter = ('status',)
+    search_fields = ('name', 'email', 'phone')
+    readonly_fields = ('created_at', 'sent_at', 'attempts', 'last_error')
+    actions = ['retry_delivery']
+
+    @admin.action(description="Повторить отправку в Telegram")
+    def retry_delivery(self, request, queryset):
+        queryset.exclude(status=ContactMessage.STATUS_SENT).update(
+            status=ContactMessage.STATUS_PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
@@ -0,0 +1,335 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import urlencode
+from django.views.decorators.http import require_safe
+
+from .cache import content_version
+from .models import (
+    FALLBACK_LANGUAGE, News, Project, ProjectFeature, ProjectResultImage, ProjectTechStack, Publication, Service,
+    SocialLink, TeamMember,
+)
+from .pagination import KeysetPaginator
+from .snapshot import read_from_snapshot
+from .views import NEWS_ORDERING, TEAM_ORDERING
+
+API_PAGE_SIZE = 20
+# Параметры, которые понимает любой ресурс (плюс его filters); остальные в ключ кэша и ETag не входят,
+# как PAGE_QUERY_PARAMS у страниц
+API_QUERY_PARAMS = ('fields', 'after', 'before', 'lang')
+LANGUAGE_CODES = [code for code, _name in settings.LANGUAGES]
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiField:
+    """
+    Поле ответа: columns(lang) — колонки, которые нужно загрузить (остальные не читаются из базы),
+    value(obj) — значение, prefetch(lang) — Prefetch для вложенных объектов.
+    """
+
+    def __init__(self, columns, value, prefetch=None):
+        self.columns = columns
+        self.value = value
+        self.prefetch = prefetch
+
+
+def plain(name):
+    return ApiField(lambda lang: [name], lambda obj: getattr(obj, name))
+
+
+def translated(prefix):
+    # Как get_tr: активный язык, при пустом значении — русский
+    return ApiField(lambda lang: [f"{prefix}_{lang}", f"{prefix}_{FALLBACK_LANGUAGE}"], lambda obj: obj.get_tr(prefix))
+
+
+def rich_text(prefix):
+    # Как get_html: обработанный HTML (main/rich_text.py), исходный не читается
+    return ApiField(
+        lambda lang: [f"{prefix}_html_{code}" for code in (lang, FALLBACK_LANGUAGE)],
+        lambda obj: obj.get_html(prefix),
+    )
+
+
+def file_url(name):
+    return ApiField(lambda lang: [name], lambda obj: getattr(obj, name).url if getattr(obj, name) else None)
+
+
+def page_url():
+    return ApiField(lambda lang: ['slug'], lambda obj: obj.get_absolute_url())
+
+
+def embed(relation, resource, fields, many=True, parent_field=None):
+    """
+    Вложенные объекты resource с полями fields одним prefetch-запросом на всю страницу.
+    parent_field — внешний ключ обратной связи: без него в выборке Django дозапрашивал бы его для каждой строки.
+    """
+    def prefetch(lang):
+        return Prefetch(relation, queryset=resource.queryset(fields, lang, extra=[parent_field] if parent_field else []))
+
+    def value(obj):
+        if many:
+            return [resource.serialize(item, fields) for item in getattr(obj, relation).all()]
+        related = getattr(obj, relation)
+        return resource.serialize(related, fields) if related is not None else None
+
+    # Для прямой связи (FK) нужна колонка <relation>_id самого объекта
+    return ApiField(lambda lang: [] if many else [relation], value, prefetch)
+
+
+class Resource:
+    def __init__(self, model, fields, default_fields, ordering=('id',), queryset=None, filters=None, models=()):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.ordering = ordering
+        self.base_queryset = queryset or (lambda: model.objects.all())
+        # Параметр запроса -> lookup, например ?category= -> category, ?project= -> project__slug
+        self.filters = filters or {}
+        # Модели, от версий которых (main/cache.py) зависит ответ: ETag и кэш меняются при их сохранении
+        self.models = (model, *models)
+
+    def parse_fields(self, request):
+        if 'fields' not in request.GET:
+            return self.default_fields
+        names = [name.strip() for name in request.GET['fields'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.fields)}")
+        return names
+
+    def queryset(self, names, lang, extra=()):
+        columns = {'pk', *extra, *(field.lstrip('-') for field in self.ordering)}
+        prefetches = []
+        for name in names:
+            field = self.fields[name]
+            columns.update(field.columns(lang))
+            if field.prefetch is not None:
+                prefetches.append(field.prefetch(lang))
+        return self.base_queryset().only(*columns).prefetch_related(*prefetches)
+
+    def serialize(self, obj, names):
+        return {name: self.fields[name].value(obj) for name in names}
+
+    def list(self, request, lang):
+        names = self.parse_fields(request)
+        queryset = self.queryset(names, lang)
+        for param, lookup in self.filters.items():
+            if param in request.GET:
+                queryset = queryset.filter(**{lookup: request.GET[param]})
+        page = KeysetPaginator(queryset, self.ordering, API_PAGE_SIZE).page(
+            after=request.GET.get('after'), before=request.GET.get('before'),
+        )
+        return {
+            'results': [self.serialize(obj, names) for obj in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        }
+
+    def detail(self, request, lang, slug):
+        names = self.parse_fields(request)
+        obj = self.queryset(names, lang).filter(slug=slug).first()
+        if obj is None:
+            raise ApiError("Not found", status=404)
+        return self.serialize(obj, names)
+
+
+# Ресурсы, которые встречаются только внутри других
+
+FEATURES = Resource(ProjectFeature, {'icon_class': plain('icon_class'), 'text': translated('text')}, [],
+                    queryset=lambda: ProjectFeature.objects.order_by('project', 'order'))
+TECH_STACK = Resource(ProjectTechStack, {'icon_class': plain('icon_class'), 'text': plain('text')}, [],
+                      queryset=lambda: ProjectTechStack.objects.order_by('project', 'order'))
+RESULT_IMAGES = Resource(ProjectResultImage, {'image': file_url('image'), 'caption': translated('caption')}, [])
+SOCIAL_LINKS = Resource(SocialLink, {'icon_class': plain('icon_class'), 'url': plain('url')}, [])
+
+PROJECTS = Resource(
+    Project,
+    {
+        'slug': plain('slug'),
+        'url': page_url(),
+        'category': plain('category'),
+        'title': translated('title'),
+        'tagline': translated('tagline'),
+        'status_tag_1': translated('status_tag_1'),
+        'status_tag_2': translated('status_tag_2'),
+        'excerpt': translated('excerpt'),
+        'full_description': rich_text('full_description'),
+        'task_subtitle': translated('task_subtitle'),
+        'task_description': rich_text('task_description'),
+        'result_description': rich_text('result_description'),
+        'detailed_info': rich_text('detailed_info'),
+        'external_link': plain('external_link'),
+        'keywords': plain('keywords'),
+        'updated_at': plain('updated_at'),
+    },
+    ['slug', 'url', 'category', 'title', 'tagline', 'excerpt'],
+    filters={'category': 'category'},
+    models=(TeamMember, ProjectFeature, ProjectTechStack, ProjectResultImage),
+)
+TEAM = Resource(
+    TeamMember,
+    {
+        'slug': plain('slug'),
+        'url': page_url(),
+        'name': translated('name'),
+        'position': translated('position'),
+        'bio': rich_text('bio'),
+        'photo': file_url('photo'),
+        'scopus_id': plain('scopus_id'),
+        'orcid_id': plain('orcid_id'),
+        'updated_at': plain('updated_at'),
+    },
+    ['slug', 'url', 'name', 'position', 'photo'],
+    ordering=TEAM_ORDERING,
+    queryset=lambda: TeamMember.objects.filter(is_visible=True),
+    models=(SocialLink, Project, Publication),
+)
+NEWS = Resource(
+    News,
+    {
+        'slug': plain('slug'),
+        'url': page_url(),
+        'category': plain('category'),
+        'title': translated('title'),
+        'excerpt': translated('excerpt'),
+        'content': rich_text('content'),
+        'image': file_url('image'),
+        'published_date': plain('published_date'),
+        'author_name': plain('author_name'),
+        'keywords': plain('keywords'),
+        'updated_at': plain('updated_at'),
+    },
+    ['slug', 'url', 'category', 'title', 'excerpt', 'image', 'published_date'],
+    ordering=NEWS_ORDERING,
+    filters={'category': 'category', 'project': 'project__slug'},
+    models=(Project,),
+)
+PUBLICATIONS = Resource(
+    Publication,
+    {
+        'title': translated('title'),
+        'source': plain('source'),
+        'publication_date': plain('publication_date'),
+        'description': rich_text('description'),
+        'url': plain('url'),
+        'updated_at': plain('updated_at'),
+    },
+    ['title', 'source', 'publication_date', 'url'],
+    ordering=('-id',),
+    filters={'member': 'member__slug', 'project': 'project__slug'},
+    models=(TeamMember, Project),
+)
+SERVICES = Resource(
+    Service,
+    {
+        'title': translated('title'),
+        'description': translated('description'),
+        'icon_class': plain('icon_class'),
+        'order': plain('order'),
+    },
+    ['title', 'description', 'icon_class'],
+    ordering=('order', 'id'),
+)
+
+# Связи добавляются после создания ресурсов: они ссылаются друг на друга
+PROJECTS.fields.update({
+    'team': embed('team', TEAM, ['slug', 'url', 'name', 'position']),
+    'features': embed('features', FEATURES, ['icon_class', 'text'], parent_field='project'),
+    'tech_stack': embed('tech_stack', TECH_STACK, ['icon_class', 'text'], parent_field='project'),
+    'result_images': embed('result_images', RESULT_IMAGES, ['image', 'caption'], parent_field='project'),
+})
+TEAM.fields.update({
+    'social_links': embed('social_links', SOCIAL_LINKS, ['icon_class', 'url'], parent_field='member'),
+    'projects': embed('projects', PROJECTS, ['slug', 'url', 'title']),
+    'publications': embed('publications', PUBLICATIONS, ['title', 'source', 'publication_date', 'url'],
+                          parent_field='member'),
+})
+NEWS.fields['project'] = embed('project', PROJECTS, ['slug', 'url', 'title'], many=False)
+PUBLICATIONS.fields.update({
+    'member': embed('member', TEAM, ['slug', 'url', 'name'], many=False),
+    'project': embed('project', PROJECTS, ['slug', 'url', 'title'], many=False),
+})
+
+RESOURCES = {
+    'projects': PROJECTS,
+    'news': NEWS,
+    'team': TEAM,
+    'publications': PUBLICATIONS,
+    'services': SERVICES,
+}
+
+
+def request_language(request):
+    # ?lang= в API важнее cookie: клиенты API выбирают язык явно
+    lang = request.GET.get('lang')
+    return lang if lang in LANGUAGE_CODES else translation.get_language()
+
+
+def api_response(request, resource, build):
+    """
+    ETag по пути, известным ресурсу параметрам, языку и версиям контента resource.models: 304 и ответ
+    из кэша — без запросов к базе. Ответ строится заново только после сохранения одной из этих моделей.
+    """
+    lang = request_language(request)
+    version = content_version(*resource.models)
+    params = urlencode([(name, request.GET[name]) for name in (*API_QUERY_PARAMS, *resource.filters)
+                        if name in request.GET])
+    digest = hashlib.md5(f"{lang}:{request.path}?{params}:{version}".encode()).hexdigest()
+    etag = f'"{digest}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content = cache.get(f"api:{digest}")
+        if content is None:
+            try:
+                with translation.override(lang):
+                    data = build(lang)
+            except ApiError as exc:
+                return JsonResponse({'error': str(exc)}, status=exc.status)
+            content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode()
+            cache.set(f"api:{digest}", content, settings.PAGE_CACHE_TIMEOUT)
+        response = HttpResponse(content, content_type='application/json')
+    response.headers.setdefault('ETag', etag)
+    response.headers['Content-Language'] = lang
+    patch_cache_control(response, public=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _resource(name):
+    if name not in RESOURCES:
+        raise ApiError("Not found", status=404)
+    return RESOURCES[name]
+
+
+@require_safe
+@read_from_snapshot
+def resource_list(request, resource):
+    try:
+        resource = _resource(resource)
+    except ApiError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    return api_response(request, resource, lambda lang: resource.list(request, lang))
+
+
+@require_safe
+@read_from_snapshot
+def resource_detail(request, resource, slug):
+    try:
+        resource = _resource(resource)
+    except ApiError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    if 'slug' not in resource.fields:
+        return JsonResponse({'error': "Not found"}, status=404)
+    return api_response(request, resource, lambda lang: resource.detail(request, lang, slug))
@@ -5,4 +5,8 @@ class MainConfig(AppConfig):
     name = 'main'
 
     def ready(self):
-        import main.signals
\ No newline at end of file
+        from django.db.backends.signals import connection_created
+        from .metrics import install_query_timer
+
+        import main.signals
+        connection_created.connect(install_query_timer, dispatch_uid='main_query_timer')
\ No newline at end of file
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+TAILWIND_CONFIG = os.path.join(settings.BASE_DIR, 'tailwind', 'tailwind.config.js')
+TAILWIND_INPUT = os.path.join(settings.BASE_DIR, 'tailwind', 'input.css')
+# Собранный CSS кладётся в исходные static/, откуда его забирает collectstatic
+BUILD_PREFIX = 'css/build'
+BUILD_DIR = os.path.join(settings.BASE_DIR, 'static', *BUILD_PREFIX.split('/'))
+MANIFEST_PATH = os.path.join(BUILD_DIR, 'tailwind.json')
+
+
+def build_tailwind(cli):
+    """
+    Собирает минифицированный CSS из классов, найденных в шаблонах и script.js (tailwind/tailwind.config.js),
+    сохраняет его как css/build/tailwind.<hash>.css и записывает путь в манифест. Возвращает путь для {% static %}.
+    cli — команда запуска Tailwind CLI списком аргументов.
+    """
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=BUILD_DIR, suffix='.css')
+    os.close(fd)
+    try:
+        subprocess.run(
+            [*cli, '-c', TAILWIND_CONFIG, '-i', TAILWIND_INPUT, '-o', temp_path, '--minify'],
+            cwd=settings.BASE_DIR, check=True, capture_output=True, text=True,
+        )
+        with open(temp_path, 'rb') as built:
+            digest = hashlib.sha256(built.read()).hexdigest()[:12]
+        filename = f'tailwind.{digest}.css'
+        os.replace(temp_path, os.path.join(BUILD_DIR, filename))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    for old in os.listdir(BUILD_DIR):
+        if old.startswith('tailwind.') and old.endswith('.css') and old != filename:
+            os.remove(os.path.join(BUILD_DIR, old))
+    path = f'{BUILD_PREFIX}/{filename}'
+    with open(MANIFEST_PATH, 'w') as manifest:
+        json.dump({'tailwind': path}, manifest)
+    tailwind_css_path.cache_clear()
+    return path
+
+
+def read_manifest():
+    # Путь собранного CSS или None, если build_css ещё не запускался
+    try:
+        with open(MANIFEST_PATH) as manifest:
+            return json.load(manifest)['tailwind']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def tailwind_css_path():
+    # Манифест меняется только при деплое (вместе с перезапуском воркеров); с DEBUG читается на каждый запрос
+    return read_manifest()
+
+
+def assets_version():
+    # Входит в ключи кэша страниц и ETag: после сборки CSS или collectstatic страницы ссылаются на новые имена
+    return f"{tailwind_css_path() or ''}:{getattr(staticfiles_storage, 'manifest_hash', '')}"
@@ -0,0 +1,135 @@
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
+from django.shortcuts import render, aget_object_or_404
+
+from .cache import cache_page_per_language, conditional_page
+from .models import (
+    TeamMember, Project, ProjectFeature, ProjectTechStack, ProjectResultImage,
+    News, Service, SocialLink, Publication
+)
+from .search import search as search_documents
+from .snapshot import read_from_snapshot
+from .views import (
+    index_querysets, team_paginator, news_paginator, category_name, project_list_queryset,
+    project_detail_queryset, team_member_detail_queryset, member_projects_queryset,
+    news_detail_queryset, split_keywords, page_params, index_stamp, team_list_stamp, project_list_stamp,
+    project_stamp, team_member_stamp, news_list_stamp, news_stamp, search_query
+)
+
+# Async-версии публичных страниц для запуска под ASGI (settings.ASYNC_VIEWS).
+# Запросы общие с main/views.py; все QuerySet вычисляются через async ORM до рендеринга,
+# а связи, которые читают шаблоны, заранее загружены prefetch_related, поэтому
+# сам рендеринг не обращается к БД и безопасен внутри event loop.
+
+
+async def arender(request, template_name, context=None):
+    context = dict(context or {})
+    for key, value in context.items():
+        if isinstance(value, QuerySet):
+            context[key] = [obj async for obj in value]
+    return render(request, template_name, context)
+
+
+@read_from_snapshot
+@conditional_page(index_stamp)
+@cache_page_per_language(TeamMember, News, Service)
+async def index(request):
+    return await arender(request, 'main/index.html', index_querysets())
+
+
+@read_from_snapshot
+@conditional_page(team_list_stamp)
+async def team_list(request):
+    context = {
+        'team_page': await team_paginator().apage(**page_params(request))
+    }
+    return await arender(request, 'main/team_list.html', context)
+
+
+@read_from_snapshot
+@conditional_page(team_list_stamp)
+async def team_list_more(request):
+    page = await team_paginator().apage(**page_params(request))
+    response = await arender(request, 'main/includes/team_cards.html', {'team_page': page})
+    response['X-Next-Cursor'] = page.next_cursor or ''
+    return response
+
+
+@read_from_snapshot
+async def labs(request):
+    return await arender(request, 'main/labs.html')
+
+
+@read_from_snapshot
+@conditional_page(project_list_stamp)
+async def project_list(request, category_slug):
+    context = {
+        'projects': project_list_queryset(category_slug),
+        'category_name': category_name(category_slug)
+    }
+    return await arender(request, 'main/project_list.html', context)
+
+
+@read_from_snapshot
+@conditional_page(project_stamp)
+@cache_page_per_language(Project, ProjectFeature, ProjectTechStack, ProjectResultImage, TeamMember, Publication, News)
+async def project_detail(request, slug):
+    project = await aget_object_or_404(project_detail_queryset(), slug=slug)
+    context = {
+        'project': project,
+        'team_members': project.team.all(),
+        'keywords_list': split_keywords(project.keywords)
+    }
+    return await arender(request, 'main/project_detail.html', context)
+
+
+@read_from_snapshot
+@conditional_page(team_member_stamp)
+@cache_page_per_language(TeamMember, SocialLink, Publication, Project)
+async def team_member_detail(request, slug):
+    member = await aget_object_or_404(team_member_detail_queryset(), slug=slug)
+    context = {
+        'member': member,
+        'projects': member_projects_queryset(member)
+    }
+    return await arender(request, 'main/team_member_detail.html', context)
+
+
+@read_from_snapshot
+@conditional_page(news_list_stamp)
+async def news_list(request):
+    context = {
+        'news_page': await news_paginator().apage(**page_params(request)),
+    }
+    return await arender(request, 'main/news_list.html', context)
+
+
+@read_from_snapshot
+@conditional_page(news_list_stamp)
+async def news_list_more(request):
+    page = await news_paginator().apage(**page_params(request))
+    response = await arender(request, 'main/includes/news_cards.html', {'news_page': page})
+    response['X-Next-Cursor'] = page.next_cursor or ''
+    return response
+
+
+@read_from_snapshot
+@conditional_page(news_stamp)
+@cache_page_per_language(News)
+async def news_detail(request, slug):
+    news_item = await aget_object_or_404(news_detail_queryset(), slug=slug)
+    context = {
+        'news_item': news_item,
+        'keywords_list': split_keywords(news_item.keywords)
+    }
+    return await arender(request, 'main/news_detail.html', context)
+
+
+@read_from_snapshot
+async def search(request):
+    query = search_query(request)
+    context = {
+        'query': query,
+        'results': await sync_to_async(search_documents)(query) if query else [],
+    }
+    return await arender(request, 'main/search.html', context)
@@ -0,0 +1,223 @@
+import hashlib
+import re
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, urlencode
+from django.utils.translation import get_language
+
+from .assets import assets_version
+
+CSRF_PLACEHOLDER = b'__csrf_token__'
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+# Параметры запроса, от которых зависят кэшируемые страницы (?lang=, main.middleware.LanguageQueryMiddleware);
+# остальные (utm_*, мусор от ботов) в ключ не входят и не плодят записи в кэше
+PAGE_QUERY_PARAMS = ('lang',)
+
+
+def _version_key(model):
+    return f"content-version:{model._meta.label_lower}"
+
+
+def _new_version():
+    return format(time.time_ns(), 'x')
+
+
+def content_version(*models):
+    # Версия контента для набора моделей: меняется при любом сохранении/удалении любой из них
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, _new_version(), None)
+        versions.update(cache.get_many(missing))
+    return _join_versions(keys, versions)
+
+
+async def acontent_version(*models):
+    keys = [_version_key(model) for model in models]
+    versions = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            await cache.aadd(key, _new_version(), None)
+        versions.update(await cache.aget_many(missing))
+    return _join_versions(keys, versions)
+
+
+def _join_versions(keys, versions):
+    return '.'.join(str(versions.get(key) or _new_version()) for key in keys)
+
+
+def bump_content_version(*models):
+    cache.set_many({_version_key(model): _new_version() for model in models}, None)
+
+
+def page_cache_key(request, models):
+    return _page_key(request, content_version(*models))
+
+
+async def apage_cache_key(request, models):
+    return _page_key(request, await acontent_version(*models))
+
+
+def _page_key(request, version):
+    params = urlencode([(name, request.GET[name]) for name in PAGE_QUERY_PARAMS if name in request.GET])
+    url = hashlib.md5(f"{request.scheme}://{request.get_host()}{request.path}?{params}".encode()).hexdigest()
+    # Путь собранного CSS меняется при деплое: страницы со ссылкой на прошлую сборку не отдаются
+    return f"page:{url}:{get_language()}:{version}:{assets_version()}"
+
+
+def cache_page_per_language(*models):
+    """
+    Кэширует страницу по адресу без посторонних параметров (PAGE_QUERY_PARAMS), активному языку
+    и версии контента перечисленных моделей.
+    Сброс происходит через bump_content_version из main/signals.py.
+    Работает и с обычными, и с async-представлениями.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_cached_view(view, models)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            key = page_cache_key(request, models)
+            cached = cache.get(key)
+            if cached is not None:
+                return _restore_response(request, cached)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, _freeze_response(response), settings.PAGE_CACHE_TIMEOUT)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _async_cached_view(view, models):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await view(request, *args, **kwargs)
+
+        key = await apage_cache_key(request, models)
+        cached = await cache.aget(key)
+        if cached is not None:
+            return _restore_response(request, cached)
+
+        response = await view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            await cache.aset(key, _freeze_response(response), settings.PAGE_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
+
+
+def _freeze_response(response):
+    # CSRF-токен в формах уникален для посетителя, поэтому в кэш кладём заглушку
+    content = CSRF_INPUT_RE.sub(rb'\1' + CSRF_PLACEHOLDER + rb'\2', response.content)
+    return content, response['Content-Type']
+
+
+def _restore_response(request, cached):
+    content, content_type = cached
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+    return HttpResponse(content, content_type=content_type)
+
+
+class ChangeStamp:
+    def __init__(self, last_modified, token):
+        self.last_modified = last_modified
+        self.token = token
+
+    @classmethod
+    def combine(cls, *stamps):
+        stamps = [stamp for stamp in stamps if stamp is not None]
+        if not stamps:
+            return None
+        return cls(max(stamp.last_modified for stamp in stamps), ':'.join(stamp.token for stamp in stamps))
+
+
+def change_stamp(queryset, *related):
+    """
+    Отметка изменения выборки одним агрегатным запросом: максимальный updated_at по самой
+    выборке и связям related (например 'team') плюс число записей, чтобы удаление тоже меняло ETag.
+    Для пустой выборки возвращает None.
+    """
+    paths = ('',) + tuple(f"{name}__" for name in related)
+    aggregates = {}
+    for i, path in enumerate(paths):
+        aggregates[f'last_{i}'] = Max(f'{path}updated_at')
+        # DISTINCT нужен только при JOIN по связям: без них он добавляет временное B-дерево
+        aggregates[f'count_{i}'] = Count(f'{path}pk', distinct=bool(related))
+    result = queryset.order_by().aggregate(**aggregates)
+    if not result['count_0']:
+        return None
+    stamps = [result[f'last_{i}'] for i in range(len(paths)) if result[f'last_{i}']]
+    token = '-'.join(str(result[key]) for key in sorted(result))
+    return ChangeStamp(max(stamps), token)
+
+
+def conditional_page(stamp_func):
+    """
+    Условный GET: ETag и Last-Modified из stamp_func(request, *args, **kwargs) -> ChangeStamp | None.
+    При совпадении отдаёт 304 без вызова представления (и без обращения к кэшу страниц).
+    Ставится поверх cache_page_per_language.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                stamp = await sync_to_async(stamp_func)(request, *args, **kwargs)
+                etag, last_modified = _validators(request, stamp)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _set_validators(request, response, etag, last_modified)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag, last_modified = _validators(request, stamp_func(request, *args, **kwargs))
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _set_validators(request, response, etag, last_modified)
+
+        return wrapper
+
+    return decorator
+
+
+def _validators(request, stamp):
+    if stamp is None:
+        return None, None
+    # Слабый ETag: разметка одинакова, но CSRF-токен в формах у каждого посетителя свой
+    digest = hashlib.md5(
+        f"{get_language()}:{request.get_full_path()}:{stamp.token}:{assets_version()}".encode()
+    ).hexdigest()
+    return f'W/"{digest}"', int(stamp.last_modified.timestamp())
+
+
+def _set_validators(request, response, etag, last_modified):
+    if request.method in ('GET', 'HEAD') and etag and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # Язык выбирается по cookie, поэтому один URL отдаёт разные представления
+        patch_vary_headers(response, ('Cookie',))
+    return response
@@ -0,0 +1,156 @@
+import datetime
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone, translation
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.translation import gettext as _, gettext_lazy
+
+from .cache import ChangeStamp, cache_page_per_language, change_stamp, conditional_page
+from .models import News, Project
+from .snapshot import read_from_snapshot
+
+FEED_SIZE = 20
+LANGUAGE_CODES = [code for code, _name in settings.LANGUAGES]
+NEWS_CATEGORY_NAMES = {
+    'events': gettext_lazy('События'),
+    'research': gettext_lazy('Исследования'),
+    'partnership': gettext_lazy('Партнерство'),
+    'other': gettext_lazy('Другое'),
+}
+
+
+class NewsFeed(Feed):
+    """
+    Последние новости на языке из адреса: все, одной категории или одного проекта.
+    Ссылки ведут на страницы с ?lang=, чтобы язык не зависел от cookie читателя.
+    """
+    feed_type = Rss201rev2Feed
+
+    def get_object(self, request, lang, category=None, slug=None):
+        project = None
+        if slug is not None:
+            project = get_object_or_404(Project.objects.only('slug', 'title_ru', f'title_{lang}'), slug=slug)
+        return {'lang': lang, 'category': category, 'project': project}
+
+    def title(self, obj):
+        if obj['project'] is not None:
+            return f"{_('Новости DIGITALEM')}: {obj['project'].title}"
+        if obj['category'] is not None:
+            return f"{_('Новости DIGITALEM')}: {NEWS_CATEGORY_NAMES[obj['category']]}"
+        return _('Новости DIGITALEM')
+
+    def link(self, obj):
+        url = obj['project'].get_absolute_url() if obj['project'] is not None else reverse('news_list')
+        return f"{url}?lang={obj['lang']}"
+
+    def description(self, obj):
+        return self.title(obj)
+
+    def items(self, obj):
+        news = News.objects.for_language(obj['lang']).defer_translations('content').order_by('-published_date', '-id')
+        if obj['project'] is not None:
+            news = news.filter(project=obj['project'])
+        if obj['category'] is not None:
+            news = news.filter(category=obj['category'])
+        return news[:FEED_SIZE]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        # Анонс считается при сохранении (у старых записей — rebuild_excerpts), текст новости не загружается
+        return item.excerpt
+
+    def item_link(self, item):
+        return f"{item.get_absolute_url()}?lang={translation.get_language()}"
+
+    def item_pubdate(self, item):
+        return timezone.make_aware(datetime.datetime.combine(item.published_date, datetime.time.min))
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        return item.author_name
+
+    def item_categories(self, item):
+        return [NEWS_CATEGORY_NAMES.get(item.category, item.category)]
+
+
+class AtomNewsFeed(NewsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+FEEDS = {'rss': NewsFeed(), 'atom': AtomNewsFeed()}
+
+
+def feed_language(view):
+    """
+    Включает язык из адреса до кэша страниц и ETag: ключ, валидаторы и сама лента зависят
+    от адреса, а не от cookie читателя.
+    """
+    @wraps(view)
+    def wrapper(request, *args, lang, **kwargs):
+        if lang not in LANGUAGE_CODES:
+            raise Http404
+        with translation.override(lang):
+            return view(request, *args, lang=lang, **kwargs)
+
+    return wrapper
+
+
+def _feed(request, lang, feed_format, **kwargs):
+    if feed_format not in FEEDS:
+        raise Http404
+    return FEEDS[feed_format](request, lang=lang, **kwargs)
+
+
+# Отметки для условного GET: updated_at новостей ленты (и проекта — его название в заголовке ленты)
+
+def news_feed_stamp(request, lang, feed_format):
+    return change_stamp(News.objects.all())
+
+
+def category_feed_stamp(request, lang, feed_format, category):
+    return change_stamp(News.objects.filter(category=category))
+
+
+def project_feed_stamp(request, lang, feed_format, slug):
+    return ChangeStamp.combine(
+        change_stamp(Project.objects.filter(slug=slug)),
+        change_stamp(News.objects.filter(project__slug=slug)),
+    )
+
+
+@feed_language
+@read_from_snapshot
+@conditional_page(news_feed_stamp)
+@cache_page_per_language(News)
+def news_feed(request, lang, feed_format):
+    return _feed(request, lang, feed_format)
+
+
+@feed_language
+@read_from_snapshot
+@conditional_page(category_feed_stamp)
+@cache_page_per_language(News)
+def category_feed(request, lang, feed_format, category):
+    if category not in NEWS_CATEGORY_NAMES:
+        raise Http404
+    return _feed(request, lang, feed_format, category=category)
+
+
+@feed_language
+@read_from_snapshot
+@conditional_page(project_feed_stamp)
+@cache_page_per_language(News, Project)
+def project_feed(request, lang, feed_format, slug):
+    return _feed(request, lang, feed_format, slug=slug)
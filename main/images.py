@@ -0,0 +1,90 @@
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+DERIVATIVES_DIR = 'derivatives'
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def derivative_name(name, width, ext='webp'):
+    root, _ext = posixpath.splitext(name)
+    return f"{DERIVATIVES_DIR}/{root}.{width}w.{ext}"
+
+
+def derivative_widths(width):
+    """
+    [(ширина в имени файла, настоящая ширина)] копий оригинала шириной width: все DERIVATIVE_WIDTHS
+    меньше оригинала и одна копия в размере оригинала под ближайшей из них, не меньшей его.
+    """
+    widths = []
+    for derivative_width in DERIVATIVE_WIDTHS:
+        widths.append((derivative_width, min(derivative_width, width)))
+        if derivative_width >= width:
+            break
+    return widths
+
+
+def closest_derivative(width, original_width):
+    """Ширина в имени копии для показа в width пикселей: наименьшая не меньше width или самая большая."""
+    names = [derivative_width for derivative_width, _actual in derivative_widths(original_width)]
+    return next((derivative_width for derivative_width in names if derivative_width >= width), names[-1])
+
+
+def has_derivatives(name, storage=default_storage):
+    # Самая узкая копия есть всегда, остальные — только если оригинал шире
+    return storage.exists(derivative_name(name, DERIVATIVE_WIDTHS[0]))
+
+
+def generate_derivatives(name, storage=default_storage, force=False):
+    """
+    Сохраняет уменьшенные копии изображения в WebP и JPEG по derivative_widths: ширины больше оригинала
+    пропускаются, копии под их именами от прошлых запусков удаляются.
+    """
+    if not name or (not force and has_derivatives(name, storage)):
+        return []
+
+    try:
+        with storage.open(name) as source:
+            image = ImageOps.exif_transpose(Image.open(source))
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        return []
+
+    created = []
+    widths = derivative_widths(image.width)
+    for width in DERIVATIVE_WIDTHS[len(widths):]:
+        for ext in DERIVATIVE_FORMATS:
+            stale = derivative_name(name, width, ext)
+            if storage.exists(stale):
+                storage.delete(stale)
+    for width, actual in widths:
+        resized = image
+        if actual < image.width:
+            resized = image.resize((actual, round(image.height * actual / image.width)), Image.LANCZOS)
+        for ext, (pil_format, options) in DERIVATIVE_FORMATS.items():
+            target = derivative_name(name, width, ext)
+            buffer = BytesIO()
+            _prepare(resized, pil_format).save(buffer, pil_format, **options)
+            if storage.exists(target):
+                storage.delete(target)
+            created.append(storage.save(target, ContentFile(buffer.getvalue())))
+    return created
+
+
+def _prepare(image, pil_format):
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        # У JPEG нет прозрачности: кладём изображение на белый фон
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    if pil_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA')
+    return image
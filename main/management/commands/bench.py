@@ -0,0 +1,337 @@
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+from statistics import median, quantiles
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from main import urls as main_urls
+from main.models import (
+    News, Project, ProjectFeature, ProjectResultImage, ProjectTechStack, Publication, Service, SocialLink,
+    TeamMember,
+)
+from main.search import rebuild_index
+from main.views import news_paginator, team_paginator
+
+BATCH_SIZE = 500
+
+WORDS = {
+    'ru': ("исследование данные система модель университет лаборатория проект результат анализ метод "
+           "разработка технология обучение сеть алгоритм платформа эксперимент внедрение качество "
+           "цифровой интеллект обработка изображение сенсор мониторинг энергия город студент грант "
+           "публикация конференция партнёр производство оптимизация прогноз измерение точность").split(),
+    'kk': ("зерттеу деректер жүйе модель университет зертхана жоба нәтиже талдау әдіс әзірлеу "
+           "технология оқыту желі алгоритм платформа тәжірибе енгізу сапа цифрлық интеллект өңдеу "
+           "сурет сенсор бақылау энергия қала студент грант жарияланым конференция серіктес өндіріс "
+           "оңтайландыру болжам өлшеу дәлдік").split(),
+    'en': ("research data system model university laboratory project result analysis method development "
+           "technology learning network algorithm platform experiment deployment quality digital "
+           "intelligence processing image sensor monitoring energy city student grant publication "
+           "conference partner production optimization forecast measurement accuracy").split(),
+}
+LANGUAGE_CODES = [code for code, _name in settings.LANGUAGES]
+
+
+class Command(BaseCommand):
+    help = ("Заполняет временную базу синтетическими данными и прогоняет все страницы main/urls.py на всех "
+            "языках через тестовый клиент: p50/p95, число запросов, время SQL, размер ответа. "
+            "Результат сохраняется в JSON и сравнивается с базовым замером (--baseline)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=3000)
+        parser.add_argument('--projects', type=int, default=300)
+        parser.add_argument('--members', type=int, default=300)
+        parser.add_argument('--publications', type=int, default=8, help="Публикаций на сотрудника")
+        parser.add_argument('--paragraphs', type=int, default=8, help="Абзацев в rich-text полях")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--requests', type=int, default=20, help="Замеров на страницу и язык")
+        parser.add_argument('--page-cache', action='store_true',
+                            help="Мерить с кэшем страниц (locmem); по умолчанию каждый запрос рендерится")
+        parser.add_argument('--db', help="Файл базы для замера: если он есть, данные не генерируются заново")
+        parser.add_argument('--output', help="Куда сохранить результаты (JSON)")
+        parser.add_argument('--baseline', help="JSON прошлого замера для сравнения")
+        parser.add_argument('--threshold', type=float, default=25,
+                            help="Допустимый рост p95, %% (запросов к БД не должно стать больше)")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = options['db'] or os.path.join(tmp, 'bench.sqlite3')
+            fresh = not os.path.exists(path)
+            use_database(path)
+            try:
+                if fresh:
+                    call_command('migrate', verbosity=0, interactive=False)
+                    started = time.perf_counter()
+                    seed(random.Random(options['seed']), options)
+                    self.stdout.write(f"Данные сгенерированы за {time.perf_counter() - started:.1f} с")
+                results = self.measure(options)
+            finally:
+                connections.close_all()
+
+        self.report(results)
+        report = {'options': {key: options[key] for key in ('news', 'projects', 'members', 'publications',
+                                                            'paragraphs', 'requests', 'page_cache')},
+                  'results': results}
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline:
+                regressions = self.compare(json.load(baseline)['results'], results, options['threshold'])
+            if regressions:
+                raise CommandError(f"Регрессии относительно {options['baseline']}: {', '.join(regressions)}")
+
+    def measure(self, options):
+        cache_backend = 'locmem.LocMemCache' if options['page_cache'] else 'dummy.DummyCache'
+        # Кэш фрагментов base.html остаётся как в настройках: он есть у каждого воркера
+        caches = {**settings.CACHES, 'default': {'BACKEND': f'django.core.cache.backends.{cache_backend}'}}
+        results = {}
+        with override_settings(CACHES=caches, DATABASE_ROUTERS=[], ALLOWED_HOSTS=['testserver'], DEBUG=False):
+            client = Client()
+            for name, path in route_paths():
+                for lang in LANGUAGE_CODES:
+                    client.cookies[settings.LANGUAGE_COOKIE_NAME] = lang
+                    timed_get(client, path)  # прогрев: шаблоны, соединение, кэш страниц
+                    samples = [timed_get(client, path) for _ in range(options['requests'])]
+                    latencies = [sample['ms'] for sample in samples]
+                    cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+                    results[f'{name} {lang}'] = {
+                        'path': path,
+                        'status': samples[-1]['status'],
+                        'p50': round(cuts[49], 2),
+                        'p95': round(cuts[94], 2),
+                        'queries': max(sample['queries'] for sample in samples),
+                        'sql_ms': round(median(sample['sql_ms'] for sample in samples), 2),
+                        'bytes': samples[-1]['bytes'],
+                    }
+        return results
+
+    def report(self, results):
+        self.stdout.write(f"\n{'страница':<28} {'p50, мс':>8} {'p95, мс':>8} {'запросы':>8} {'SQL, мс':>8} "
+                          f"{'КБ':>7}")
+        for key, row in results.items():
+            status = '' if row['status'] == 200 else f"  [{row['status']}]"
+            self.stdout.write(
+                f"{key:<28} {row['p50']:>8.1f} {row['p95']:>8.1f} {row['queries']:>8} {row['sql_ms']:>8.1f} "
+                f"{row['bytes'] / 1024:>7.1f}{status}"
+            )
+
+    def compare(self, baseline, results, threshold):
+        self.stdout.write(f"\n{'страница':<28} {'p50':>8} {'p95':>8} {'запросы':>8} {'КБ':>7}")
+        regressions = []
+        for key, row in results.items():
+            before = baseline.get(key)
+            if before is None:
+                continue
+            slower = row['p95'] > before['p95'] * (1 + threshold / 100) and row['p95'] - before['p95'] > 1
+            more_queries = row['queries'] > before['queries']
+            if slower or more_queries:
+                regressions.append(key)
+            self.stdout.write(
+                f"{key:<28} {percent(before['p50'], row['p50']):>8} {percent(before['p95'], row['p95']):>8} "
+                f"{row['queries'] - before['queries']:>+8} {(row['bytes'] - before['bytes']) / 1024:>+7.1f}"
+                f"{'  !' if slower or more_queries else ''}"
+            )
+        return regressions
+
+
+def use_database(path):
+    # Тот же приём, что и в bench_sqlite: соединение переподключится к указанному файлу
+    connections.close_all()
+    db = connections.settings['default']
+    db['NAME'] = path
+    db['OPTIONS'] = {}
+
+
+def percent(before, after):
+    return f"{(after - before) / before * 100:+.0f}%" if before else '-'
+
+
+def timed_get(client, path):
+    sql = {'queries': 0, 'seconds': 0.0}
+
+    def timing(execute, *args):
+        started = time.perf_counter()
+        try:
+            return execute(*args)
+        finally:
+            sql['queries'] += 1
+            sql['seconds'] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    with connection.execute_wrapper(timing):
+        response = client.get(path)
+        # Потоковые ответы (карта сайта) строятся при чтении: оно входит в замер
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+    return {
+        'ms': (time.perf_counter() - started) * 1000,
+        'status': response.status_code,
+        'queries': sql['queries'],
+        'sql_ms': sql['seconds'] * 1000,
+        'bytes': len(content),
+    }
+
+
+def route_paths():
+    """Все маршруты main/urls.py с аргументами из сгенерированных данных (середина архива для курсоров)."""
+    project = Project.objects.order_by('pk').first()
+    member = TeamMember.objects.filter(is_visible=True).order_by('pk').first()
+    news = News.objects.order_by(*news_paginator().ordering)
+    middle_news = news[news.count() // 2]
+    members = TeamMember.objects.filter(is_visible=True).order_by(*team_paginator().ordering)
+    middle_member = members[members.count() // 2]
+    arguments = {
+        'project_list': ({'category_slug': project.category}, ''),
+        'project_detail': ({'slug': project.slug}, ''),
+        'news_list_more': ({}, f'?after={news_paginator().encode_cursor(middle_news)}'),
+        'news_detail': ({'slug': news.first().slug}, ''),
+        'team_list_more': ({}, f'?after={team_paginator().encode_cursor(middle_member)}'),
+        'team_member_detail': ({'slug': member.slug}, ''),
+        'search': ({}, '?q=университет'),
+        'sitemap_section': ({'section': 'news', 'page': 1}, ''),
+        'news_feed': ({'lang': 'ru', 'feed_format': 'rss'}, ''),
+        'news_category_feed': ({'lang': 'ru', 'category': 'research', 'feed_format': 'atom'}, ''),
+        'project_news_feed': ({'lang': 'ru', 'slug': project.slug, 'feed_format': 'rss'}, ''),
+        'api_list': ({'resource': 'news'}, f'?after={news_paginator().encode_cursor(middle_news)}'),
+        'api_detail': ({'resource': 'projects', 'slug': project.slug}, '?fields=slug,title,team,features'),
+    }
+    for pattern in main_urls.urlpatterns:
+        kwargs, query = arguments.get(pattern.name, ({}, ''))
+        if set(pattern.pattern.converters) != set(kwargs):
+            raise CommandError(f"Для маршрута {pattern.name} не заданы аргументы в route_paths()")
+        yield pattern.name, reverse(pattern.name, kwargs=kwargs) + query
+
+
+def sentence(rng, lang, words):
+    text = ' '.join(rng.choice(WORDS[lang]) for _ in range(words))
+    return text[0].upper() + text[1:]
+
+
+def rich_html(rng, lang, paragraphs):
+    # Разметка, как из CKEditor: заголовки, выделение, ссылки, списки и картинки
+    parts = []
+    for i in range(paragraphs):
+        if i % 4 == 1:
+            parts.append(f"<h3>{sentence(rng, lang, 4)}</h3>")
+        if i % 5 == 3:
+            items = ''.join(f"<li>{sentence(rng, lang, 6)}</li>" for _ in range(4))
+            parts.append(f"<ul>{items}</ul>")
+        if i % 6 == 5:
+            parts.append(f'<p><img alt="" src="/media/uploads/bench/{rng.randint(1, 50)}.jpg" '
+                         f'style="width:800px; height:450px" /></p>')
+        parts.append(
+            f"<p>{sentence(rng, lang, 20)} <strong>{sentence(rng, lang, 3)}</strong> "
+            f'<a href="https://example.com/{rng.randint(1, 999)}">{sentence(rng, lang, 2)}</a> '
+            f"{sentence(rng, lang, 25)}.</p>"
+        )
+    return ''.join(parts)
+
+
+def translated(field, make):
+    return {f'{field}_{lang}': make(lang) for lang in LANGUAGE_CODES}
+
+
+def bulk(model, objects):
+    return model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+
+
+def rendered(objects):
+    # bulk_create не вызывает save(): обработанный HTML считается заранее, как при сохранении в админке
+    for obj in objects:
+        obj.update_rich_text()
+    return objects
+
+
+@transaction.atomic
+def seed(rng, options):
+    paragraphs = options['paragraphs']
+    html = lambda lang: rich_html(rng, lang, paragraphs)  # noqa: E731
+
+    members = bulk(TeamMember, rendered([
+        TeamMember(
+            slug=f'member-{i}', is_visible=i % 20 != 0, photo=f'team_photos/bench-{i % 50}.jpg',
+            **translated('name', lambda lang: sentence(rng, lang, 2)),
+            **translated('position', lambda lang: sentence(rng, lang, 3)),
+            **translated('bio', html),
+        )
+        for i in range(options['members'])
+    ]))
+    bulk(SocialLink, [
+        SocialLink(member=member, icon_class='fab fa-linkedin', url=f'https://example.com/{member.slug}/{i}')
+        for member in members for i in range(2)
+    ])
+
+    categories = [code for code, _name in Project.CATEGORY_CHOICES]
+    projects = []
+    for i in range(options['projects']):
+        project = Project(
+            slug=f'project-{i}', category=categories[i % len(categories)], keywords='data, ml, iot',
+            **translated('title', lambda lang: sentence(rng, lang, 3)),
+            **translated('tagline', lambda lang: sentence(rng, lang, 8)),
+            **translated('full_description', html),
+            **translated('task_description', html),
+            **translated('result_description', html),
+        )
+        project.update_excerpts()
+        project.update_rich_text()
+        projects.append(project)
+    projects = bulk(Project, projects)
+    bulk(Project.team.through, [
+        Project.team.through(project=project, teammember=member)
+        for project in projects for member in rng.sample(members, min(5, len(members)))
+    ])
+    bulk(ProjectFeature, [
+        ProjectFeature(project=project, icon_class='fas fa-cogs', order=i,
+                       **translated('text', lambda lang: sentence(rng, lang, 4)))
+        for project in projects for i in range(3)
+    ])
+    bulk(ProjectTechStack, [
+        ProjectTechStack(project=project, icon_class='fab fa-python', text=f'Tech {i}', order=i)
+        for project in projects for i in range(4)
+    ])
+    bulk(ProjectResultImage, [
+        ProjectResultImage(project=project, image=f'project_results/bench-{i}.png',
+                           **translated('caption', lambda lang: sentence(rng, lang, 5)))
+        for project in projects for i in range(3)
+    ])
+
+    bulk(Publication, rendered([
+        Publication(
+            member=member, project=rng.choice(projects), source=sentence(rng, 'en', 3),
+            publication_date=datetime.date(2010, 1, 1) + datetime.timedelta(days=rng.randrange(5000)),
+            **translated('title', lambda lang: sentence(rng, lang, 8)),
+            **translated('description', lambda lang: f"<p>{sentence(rng, lang, 30)}</p>"),
+        )
+        for member in members for _ in range(options['publications'])
+    ]))
+
+    news_categories = [code for code, _name in News.CATEGORY_CHOICES]
+    news = []
+    for i in range(options['news']):
+        item = News(
+            slug=f'news-{i}', image=f'news_images/bench-{i % 50}.png', category=rng.choice(news_categories),
+            published_date=datetime.date(2015, 1, 1) + datetime.timedelta(days=i * 3650 // max(options['news'], 1)),
+            project=rng.choice(projects) if i % 3 == 0 else None, keywords='science, lab',
+            **translated('title', lambda lang: sentence(rng, lang, 7)),
+            **translated('content', html),
+        )
+        item.update_excerpts()
+        item.update_rich_text()
+        news.append(item)
+    bulk(News, news)
+
+    bulk(Service, [
+        Service(order=i, icon_class='fas fa-flask', **translated('title', lambda lang: sentence(rng, lang, 3)),
+                **translated('description', lambda lang: sentence(rng, lang, 20)))
+        for i in range(8)
+    ])
+    rebuild_index()
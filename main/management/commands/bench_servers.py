@@ -0,0 +1,142 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from statistics import quantiles
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ('/', '/news/', '/team/', '/projects/research/')
+MODES = {
+    'wsgi': ('digitalem_project.wsgi:application', None, 'False'),
+    'asgi': ('digitalem_project.asgi:application', 'uvicorn_worker.UvicornWorker', 'True'),
+}
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает gunicorn в режиме WSGI и ASGI (uvicorn-воркеры): "
+            "пропускная способность, задержки и потребление памяти на текущей базе")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--wsgi-workers', type=int, default=3)
+        parser.add_argument('--asgi-workers', type=int, default=3)
+        parser.add_argument('--threads', type=int, default=1, help="Потоков на WSGI-воркер (gthread при > 1)")
+        parser.add_argument('--concurrency', type=int, default=50, help="Одновременных запросов")
+        parser.add_argument('--requests', type=int, default=2000, help="Всего запросов на режим")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--path', dest='paths', action='append', help="Страница для нагрузки (можно несколько)")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        results = []
+        for mode in options['modes']:
+            workers = options[f'{mode}_workers']
+            self.stdout.write(f"{mode}: {workers} воркер(ов), {options['concurrency']} одновременных запросов")
+            server = self.start_server(mode, workers, options['threads'], options['port'])
+            try:
+                base_url = f"http://127.0.0.1:{options['port']}"
+                self.wait_ready(server, base_url)
+                asyncio.run(self.load(base_url, paths, options['concurrency'], len(paths) * 2))
+                stats = asyncio.run(self.load(base_url, paths, options['concurrency'], options['requests']))
+                stats['rss_mb'] = process_tree_rss(server.pid) / 1024 / 1024
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=30)
+            results.append((mode, workers, stats))
+
+        self.stdout.write(f"\n{'режим':<6} {'воркеры':>7} {'RSS, МБ':>8} {'RPS':>8} {'RPS/100МБ':>10} "
+                          f"{'p50, мс':>8} {'p95, мс':>8} {'ошибки':>7}")
+        for mode, workers, stats in results:
+            self.stdout.write(
+                f"{mode:<6} {workers:>7} {stats['rss_mb']:>8.1f} {stats['rps']:>8.1f} "
+                f"{stats['rps'] / stats['rss_mb'] * 100:>10.1f} {stats['p50']:>8.1f} {stats['p95']:>8.1f} "
+                f"{stats['errors']:>7}"
+            )
+
+    def start_server(self, mode, workers, threads, port):
+        app, worker_class, async_views = MODES[mode]
+        command = [
+            sys.executable, '-m', 'gunicorn', app,
+            '--workers', str(workers),
+            '--bind', f'127.0.0.1:{port}',
+            '--log-level', 'warning',
+        ]
+        if worker_class:
+            command += ['--worker-class', worker_class]
+        elif threads > 1:
+            command += ['--worker-class', 'gthread', '--threads', str(threads)]
+        env = dict(os.environ, ASYNC_VIEWS=async_views, DEBUG='False')
+        env['ALLOWED_HOSTS'] = ','.join(set(settings.ALLOWED_HOSTS) | {'127.0.0.1'})
+        try:
+            return subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        except OSError as e:
+            raise CommandError(f"Не удалось запустить gunicorn: {e}")
+
+    def wait_ready(self, server, base_url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"gunicorn завершился с кодом {server.returncode}")
+            try:
+                httpx.get(base_url + '/', timeout=1)
+                return
+            except httpx.TransportError:
+                time.sleep(0.2)
+        raise CommandError("gunicorn не начал отвечать вовремя")
+
+    async def load(self, base_url, paths, concurrency, total):
+        latencies = []
+        errors = 0
+        queue = asyncio.Queue()
+        for i in range(total):
+            queue.put_nowait(paths[i % len(paths)])
+
+        async def client_loop(client):
+            nonlocal errors
+            while not queue.empty():
+                path = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        return {'rps': total / elapsed, 'p50': cuts[49], 'p95': cuts[94], 'errors': errors}
+
+
+def process_tree_rss(pid):
+    # RSS мастер-процесса и всех воркеров по /proc (только Linux)
+    total = 0
+    for child in [pid] + child_pids(pid):
+        try:
+            with open(f'/proc/{child}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+        except FileNotFoundError:
+            continue
+    return total
+
+
+def child_pids(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as children:
+            pids = [int(child) for child in children.read().split()]
+    except FileNotFoundError:
+        return []
+    return pids + [grandchild for child in pids for grandchild in child_pids(child)]
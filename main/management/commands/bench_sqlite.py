@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from statistics import quantiles
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import translation
+
+from main.models import Project
+from main.utils import is_database_locked
+from main.views import index_querysets, news_paginator, project_list_queryset
+
+PROFILES = ('default', 'production')
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает чтение из SQLite во время сохранения в админке: обычные настройки "
+            "против профиля SQLITE_PRODUCTION (WAL, прагмы, постоянные соединения). "
+            "Работает на временной копии базы")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+        parser.add_argument('--readers', type=int, default=4, help="Процессов-читателей (как воркеры gunicorn)")
+        parser.add_argument('--duration', type=float, default=5, help="Длительность замера на профиль, сек.")
+        parser.add_argument('--write-hold', type=float, default=0.2,
+                            help="Сколько секунд транзакция сохранения остаётся открытой (тяжёлая форма с inline)")
+
+    def handle(self, *args, **options):
+        source = settings.DATABASES['default']['NAME']
+        if not os.path.exists(source):
+            raise CommandError(f"База {source} не найдена: выполните migrate")
+
+        results = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for profile in options['profiles']:
+                path = os.path.join(tmp, f'{profile}.sqlite3')
+                copy_database(source, path, journal_mode='WAL' if profile == 'production' else 'DELETE')
+                use_database(path, production=profile == 'production')
+                if not Project.objects.exists():
+                    Project.objects.create(title_ru="Проект", slug='bench-project', tagline_ru="-",
+                                           full_description_ru="<p>-</p>")
+                results.append((profile, *self.measure(options)))
+                connections.close_all()
+
+        self.stdout.write(f"\n{'профиль':<11} {'чтений/с':>9} {'p50, мс':>8} {'p95, мс':>8} {'max, мс':>8} "
+                          f"{'locked':>7} {'записей':>8}")
+        for profile, reads, writes in results:
+            latencies = [latency for latency, _locked in reads]
+            locked = sum(1 for _latency, was_locked in reads if was_locked)
+            cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(
+                f"{profile:<11} {len(reads) / options['duration']:>9.1f} {cuts[49]:>8.1f} {cuts[94]:>8.1f} "
+                f"{max(latencies):>8.1f} {locked:>7} {writes:>8}"
+            )
+
+    def measure(self, options):
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        deadline = time.monotonic() + options['duration']
+        readers = [context.Process(target=read_loop, args=(deadline, queue)) for _ in range(options['readers'])]
+        for reader in readers:
+            reader.start()
+
+        writes = 0
+        project = Project.objects.order_by('pk').first()
+        while time.monotonic() < deadline:
+            try:
+                with transaction.atomic():
+                    project.save()
+                    time.sleep(options['write_hold'])
+                writes += 1
+            except Exception as e:
+                if not is_database_locked(e):
+                    raise
+            time.sleep(0.05)
+
+        reads = []
+        for _reader in readers:
+            reads.extend(queue.get())
+        for reader in readers:
+            reader.join()
+        return reads, writes
+
+
+def read_loop(deadline, queue):
+    # Процесс-читатель: те же запросы, что и публичные страницы; без постоянных соединений
+    # соединение закрывается после каждого «запроса», как в обработчике request_finished
+    translation.activate('ru')
+    persistent = connection.settings_dict['CONN_MAX_AGE'] != 0
+    reads = []
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        locked = False
+        try:
+            list(project_list_queryset('research'))
+            news_paginator().page()
+            list(index_querysets()['latest_news'])
+        except Exception as e:
+            if not is_database_locked(e):
+                raise
+            locked = True
+        if not persistent:
+            connection.close()
+        reads.append(((time.perf_counter() - started) * 1000, locked))
+    connection.close()
+    queue.put(reads)
+
+
+def copy_database(source, target, journal_mode):
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+        dst.execute(f"PRAGMA journal_mode={journal_mode}")
+    src.close()
+    dst.close()
+
+
+def use_database(path, production):
+    # settings_dict соединения — этот же словарь: после закрытия оно переподключится к копии
+    # базы с настройками профиля (как и соединения в дочерних процессах)
+    connections.close_all()
+    db = connections.settings['default']
+    db['NAME'] = path
+    db['OPTIONS'] = dict(settings.SQLITE_PRODUCTION_OPTIONS) if production else {}
+    db['CONN_MAX_AGE'] = 600 if production else 0
+    db['CONN_HEALTH_CHECKS'] = production
@@ -0,0 +1,25 @@
+import shlex
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.assets import build_tailwind
+
+
+class Command(BaseCommand):
+    help = ("Собирает Tailwind CSS из классов, которые используются в шаблонах и static/js/script.js, "
+            "в static/css/build/tailwind.<hash>.css (вызывается из collectstatic)")
+
+    def handle(self, *args, **options):
+        cli = shlex.split(settings.TAILWIND_CLI)
+        try:
+            path = build_tailwind(cli)
+        except FileNotFoundError:
+            raise CommandError(
+                f"Tailwind CLI не найден ({settings.TAILWIND_CLI}). Скачайте standalone-сборку tailwindcss "
+                f"или укажите команду в TAILWIND_CLI"
+            )
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"Tailwind CLI завершился с ошибкой:\n{e.stderr}")
+        self.stdout.write(self.style.SUCCESS(f"CSS собран: {path}"))
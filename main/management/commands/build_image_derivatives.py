@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from main.images import generate_derivatives
+from main.signals import IMAGE_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Создаёт WebP/JPEG копии фотографий и изображений новостей для srcset"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Пересоздать уже существующие копии")
+
+    def handle(self, *args, force=False, **options):
+        for model, field in IMAGE_FIELDS.items():
+            created = 0
+            names = model.objects.exclude(**{field: ''}).values_list(field, flat=True).distinct()
+            for name in names.iterator():
+                created += len(generate_derivatives(name, force=force))
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {created}")
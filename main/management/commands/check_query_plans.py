@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.query_plans import collect_plans
+
+
+class Command(BaseCommand):
+    help = ("Проверяет EXPLAIN QUERY PLAN запросов публичных страниц: ошибка, если запрос обходит таблицу "
+            "без индекса или сортирует во временном B-дереве. -v 2 печатает планы всех запросов")
+
+    def handle(self, *args, **options):
+        try:
+            results = collect_plans()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        failures = 0
+        for url, sql, plan, problems in results:
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"{url}: {sql}"))
+            elif options['verbosity'] >= 2:
+                self.stdout.write(f"{url}: {sql}")
+            if problems or options['verbosity'] >= 2:
+                for detail in plan:
+                    marker = '!' if detail in problems else ' '
+                    self.stdout.write(f"  {marker} {detail}")
+
+        if failures:
+            raise CommandError(f"Запросов без подходящего индекса: {failures} из {len(results)}")
+        self.stdout.write(self.style.SUCCESS(f"Проверено запросов: {len(results)}, все используют индексы"))
@@ -0,0 +1,20 @@
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStaticCommand
+from django.core.management import call_command
+
+
+class Command(CollectStaticCommand):
+    help = ("Собирает Tailwind CSS (build_css), затем статические файлы, как стандартный collectstatic, "
+            "и печатает отчёт о сжатии (static_report)")
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--skip-css', action='store_true', help="Не пересобирать Tailwind CSS")
+
+    def handle(self, **options):
+        if not options['skip_css'] and not options['dry_run']:
+            call_command('build_css', verbosity=options['verbosity'])
+        summary = super().handle(**options)
+        if summary:
+            self.stdout.write(summary)
+        if options['verbosity'] >= 1 and not options['dry_run']:
+            call_command('static_report', stdout=self.stdout)
@@ -0,0 +1,31 @@
+import asyncio
+
+import telegram
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.outbox import BATCH_SIZE, MAX_ATTEMPTS, OutboxDispatcher
+
+
+class Command(BaseCommand):
+    help = "Отправляет заявки с сайта из очереди в Telegram (отдельный долгоживущий процесс)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Отправить всё, что готово к отправке, и выйти")
+        parser.add_argument('--interval', type=float, default=5, help="Пауза между опросами пустой очереди, сек.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--api-url', default=settings.TELEGRAM_API_URL,
+                            help="Базовый URL Bot API, например заглушка http://127.0.0.1:8081/bot")
+
+    def handle(self, *args, **options):
+        asyncio.run(self.dispatch(options))
+
+    async def dispatch(self, options):
+        bot = telegram.Bot(token=settings.TELEGRAM_BOT_TOKEN, base_url=options['api_url'])
+        async with bot:
+            dispatcher = OutboxDispatcher(
+                bot, settings.TELEGRAM_CHAT_ID,
+                batch_size=options['batch_size'], max_attempts=options['max_attempts'],
+            )
+            await dispatcher.run(interval=options['interval'], once=options['once'])
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.transfer import BATCH_SIZE, export_content
+
+
+class Command(BaseCommand):
+    help = ("Выгружает проекты, новости, сотрудников, публикации и услуги в <каталог>/content.jsonl, "
+            "файлы — в <каталог>/media под sha256 содержимого")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Каталог архива")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = export_content(options['path'], batch_size=options['batch_size'])
+        for kind, count in counts.items():
+            self.stdout.write(f"{kind}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Архив {options['path']} записан за {time.perf_counter() - started:.1f} с"
+        ))
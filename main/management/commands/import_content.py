@@ -0,0 +1,30 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from main.transfer import BATCH_SIZE, finish_import, import_content
+
+
+class Command(BaseCommand):
+    help = ("Загружает архив export_content: записи с тем же slug обновляются, остальные создаются. "
+            "Затем перестраивает индекс поиска и сбрасывает кэш страниц")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Каталог архива")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            counts = import_content(options['path'], batch_size=options['batch_size'])
+        except (ValueError, ValidationError, OSError) as exc:
+            # Уже записанные пачки остаются: повторный запуск обновит их по slug
+            raise CommandError(exc)
+        finally:
+            finish_import()
+        for kind, (created, updated) in counts.items():
+            self.stdout.write(f"{kind}: создано {created}, обновлено {updated}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Архив {options['path']} загружен за {time.perf_counter() - started:.1f} с"
+        ))
@@ -0,0 +1,35 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.prerender import page_urls, prune, render_pages
+
+
+class Command(BaseCommand):
+    help = ("Рендерит публичные страницы (главная, лаборатории, категории проектов, списки и страницы "
+            "проектов, новостей и сотрудников) на всех языках в PRERENDER_ROOT/<язык>/ для раздачи nginx")
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', help="Только эти адреса (например /news/); по умолчанию все страницы")
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help="Процессов рендеринга (по умолчанию по числу CPU)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        urls = set(options['urls']) or page_urls()
+        results = render_pages(urls, processes=options['processes'])
+
+        failed = [(lang, url, status) for lang, url, status, _size in results if status not in (200, 404)]
+        for lang, url, status in failed:
+            self.stderr.write(self.style.ERROR(f"{lang} {url}: {status}"))
+        rendered = sum(1 for _lang, _url, status, _size in results if status == 200)
+        size = sum(size for *_rest, size in results) / 1024 / 1024
+        removed = 0 if options['urls'] else prune(urls)
+        if failed:
+            raise CommandError(f"Не отрендерено страниц: {len(failed)} из {len(results)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Страниц: {rendered} ({size:.1f} МБ) в {settings.PRERENDER_ROOT}, удалено устаревших: {removed}, "
+            f"{time.perf_counter() - started:.1f} с"
+        ))
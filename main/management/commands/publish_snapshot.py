@@ -0,0 +1,21 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.signals import CONTENT_MODELS
+from main.snapshot import publish_snapshot
+
+
+class Command(BaseCommand):
+    help = ("Публикует снимок базы для публичных страниц (READ_SNAPSHOT=True) и сбрасывает кэш страниц. "
+            "Нужен при первом запуске и при SNAPSHOT_PUBLISH_ON_SAVE=False")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        publish_snapshot(CONTENT_MODELS)
+        size = os.path.getsize(settings.SNAPSHOT_PATH) / 1024 / 1024
+        self.stdout.write(self.style.SUCCESS(
+            f"Снимок {settings.SNAPSHOT_PATH} ({size:.1f} МБ) опубликован за {time.perf_counter() - started:.2f} с"
+        ))
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.models import News, Project
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает excerpt_<lang> для новостей и проектов из их rich-text полей"
+
+    def handle(self, *args, **options):
+        excerpt_fields = [f"excerpt_{code}" for code, _name in settings.LANGUAGES]
+        for model in (News, Project):
+            source_fields = [f"{model.excerpt_source}_{code}" for code, _name in settings.LANGUAGES]
+            batch, total = [], 0
+            for obj in model.objects.only('pk', *source_fields).iterator(chunk_size=BATCH_SIZE):
+                obj.update_excerpts()
+                batch.append(obj)
+                if len(batch) >= BATCH_SIZE:
+                    total += model.objects.bulk_update(batch, excerpt_fields)
+                    batch = []
+            if batch:
+                total += model.objects.bulk_update(batch, excerpt_fields)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {total}")
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.models import News, Project, Publication, TeamMember
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает <поле>_html_<lang> (размеры, lazy-загрузка и WebP-копии картинок) из rich-text полей"
+
+    def handle(self, *args, **options):
+        languages = [code for code, _name in settings.LANGUAGES]
+        for model in (Project, News, TeamMember, Publication):
+            source_fields = [f"{prefix}_{code}" for prefix in model.rich_text_fields for code in languages]
+            html_fields = [f"{prefix}_html_{code}" for prefix in model.rich_text_fields for code in languages]
+            batch, total = [], 0
+            for obj in model.objects.only('pk', *source_fields).iterator(chunk_size=BATCH_SIZE):
+                obj.update_rich_text()
+                batch.append(obj)
+                if len(batch) >= BATCH_SIZE:
+                    total += model.objects.bulk_update(batch, html_fields)
+                    batch = []
+            if batch:
+                total += model.objects.bulk_update(batch, html_fields)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {total}")
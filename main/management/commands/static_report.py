@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from main.staticfiles import brotli, compression_report
+
+
+class Command(BaseCommand):
+    help = ("Сколько байт экономят сжатые копии .gz/.br в STATIC_ROOT по типам файлов "
+            "(вызывается в конце collectstatic)")
+
+    def handle(self, *args, **options):
+        report = compression_report()
+        if not report:
+            self.stdout.write("STATIC_ROOT пуст: выполните collectstatic")
+            return
+        rows = sorted(report.items(), key=lambda item: -item[1]['original'])
+        total = {field: sum(row[field] for _extension, row in rows) for field in rows[0][1]}
+
+        # Без brotli копий .br нет, колонка повторяла бы исходный размер
+        br_header = f" {'br, КБ':>9}" if brotli is not None else ''
+        self.stdout.write(f"\n{'тип':<8} {'файлов':>7} {'исходно, КБ':>12} {'gzip, КБ':>9}{br_header} "
+                          f"{'экономия, КБ':>13} {'%':>4}")
+        for extension, row in rows + [("всего", total)]:
+            percent = row['saved'] * 100 / row['original'] if row['original'] else 0
+            br = f" {row['br'] / 1024:>9.1f}" if brotli is not None else ''
+            self.stdout.write(
+                f"{extension:<8} {row['files']:>7} {row['original'] / 1024:>12.1f} {row['gzip'] / 1024:>9.1f}{br} "
+                f"{row['saved'] / 1024:>13.1f} {percent:>3.0f}%"
+            )
+        if brotli is None:
+            self.stdout.write("brotli не установлен: копии .br не создаются")
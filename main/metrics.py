@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Имя -> (тип, описание, границы корзин гистограммы)
+METRICS = {
+    'digitalem_request_duration_seconds': ('histogram', "Время обработки запроса", DURATION_BUCKETS),
+    'digitalem_db_query_duration_seconds': ('histogram', "Суммарное время SQL за запрос", DURATION_BUCKETS),
+    'digitalem_db_queries': ('histogram', "Число SQL-запросов за запрос", QUERY_COUNT_BUCKETS),
+    'digitalem_template_render_seconds': ('histogram', "Время рендеринга шаблонов за запрос", DURATION_BUCKETS),
+    'digitalem_responses_total': ('counter', "Ответы по классу статуса", None),
+}
+
+# Замеры текущего запроса; asgiref копирует контекст в потоки sync_to_async, поэтому запросы к БД
+# из async-представлений попадают в тот же объект
+current_request = ContextVar('current_request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'queries', 'query_seconds', 'template_seconds', 'total_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.total_seconds = 0.0
+
+
+def time_query(execute, sql, params, many, context):
+    # Обёртка выполнения SQL, ставится на каждое соединение (см. MainConfig.ready)
+    metrics = current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.query_seconds += time.perf_counter() - started
+
+
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current_request.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, который учитывает время рендеринга в замерах запроса (include входят в родителя)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class MetricsStore:
+    """
+    Гистограммы и счётчики процесса. Каждый воркер gunicorn периодически записывает свои значения
+    в METRICS_DIR/<pid>.json (атомарно, через os.replace), /metrics суммирует файлы всех воркеров.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.flushed_at = time.monotonic()
+
+    def observe(self, name, labels, value):
+        _kind, _help, buckets = METRICS[name]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    sample['buckets'][i] += 1
+            sample['sum'] += value
+            sample['count'] += 1
+
+    def increment(self, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            sample = self.samples.setdefault(key, {'count': 0})
+            sample['count'] += 1
+
+    def maybe_flush(self):
+        if time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self.flushed_at = time.monotonic()
+            data = [[name, dict(labels), sample] for (name, labels), sample in self.samples.items()]
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as output:
+            json.dump(data, output)
+        os.replace(temp_path, path)
+
+    def collect(self):
+        # Сумма по файлам всех воркеров; файлы завершённых воркеров остаются (счётчики монотонны)
+        self.flush()
+        merged = {}
+        for filename in os.listdir(settings.METRICS_DIR):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(settings.METRICS_DIR, filename)) as source:
+                    data = json.load(source)
+            except (OSError, ValueError):
+                continue
+            for name, labels, sample in data:
+                if name not in METRICS:
+                    continue
+                key = (name, tuple(sorted(labels.items())))
+                total = merged.setdefault(key, {field: [0] * len(value) if isinstance(value, list) else 0
+                                                for field, value in sample.items()})
+                for field, value in sample.items():
+                    if isinstance(value, list):
+                        total[field] = [a + b for a, b in zip(total[field], value)]
+                    else:
+                        total[field] += value
+        return merged
+
+
+store = MetricsStore()
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    return ','.join(f'{key}="{escape_label(value)}"' for key, value in pairs)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(merged):
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+        for (sample_name, labels), sample in sorted(merged.items()):
+            if sample_name != name:
+                continue
+            if kind == 'counter':
+                lines.append(f"{name}{{{_labels(labels)}}} {sample['count']}")
+                continue
+            for bound, count in zip(buckets, sample['buckets']):
+                lines.append(f"{name}_bucket{{{_labels(labels, le=bound)}}} {count}")
+            lines.append(f"{name}_bucket{{{_labels(labels, le='+Inf')}}} {sample['count']}")
+            lines.append(f"{name}_sum{{{_labels(labels)}}} {sample['sum']}")
+            lines.append(f"{name}_count{{{_labels(labels)}}} {sample['count']}")
+    return '\n'.join(lines) + '\n'
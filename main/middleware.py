@@ -0,0 +1,106 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from django.utils import translation
+from django.utils.translation import get_language, gettext as _
+
+from .metrics import RequestMetrics, current_request, store
+from .utils import is_database_locked
+
+logger = logging.getLogger(__name__)
+
+LANGUAGE_CODES = {code for code, _name in settings.LANGUAGES}
+
+
+class DatabaseLockedMiddleware(MiddlewareMixin):
+    """
+    Если запись в SQLite не дождалась блокировки (другой воркер держит транзакцию дольше timeout),
+    отвечаем 503 с Retry-After вместо 500: запрос можно повторить.
+    """
+
+    def process_exception(self, request, exception):
+        if not is_database_locked(exception):
+            return None
+        logger.warning("Database is locked: %s %s", request.method, request.path)
+        response = HttpResponse(_("Сервер занят, повторите запрос через несколько секунд."), status=503,
+                                content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(settings.DATABASE_LOCKED_RETRY_AFTER)
+        return response
+
+
+class LanguageQueryMiddleware(MiddlewareMixin):
+    """
+    Язык из параметра ?lang= (ссылки hreflang в sitemap.xml) для посетителей без cookie языка.
+    Выбор на сайте (cookie) важнее: после переключения языка форма возвращает на тот же адрес с ?lang=.
+    Ставится после LocaleMiddleware.
+    """
+
+    def process_request(self, request):
+        lang = request.GET.get('lang')
+        if lang in LANGUAGE_CODES and settings.LANGUAGE_COOKIE_NAME not in request.COOKIES:
+            translation.activate(lang)
+            request.LANGUAGE_CODE = lang
+
+
+class RequestMetricsMiddleware(MiddlewareMixin):
+    """
+    Замеры каждого запроса: число и время SQL, время рендеринга шаблонов и общее время, по имени
+    маршрута и языку. Сотрудникам отдаются в заголовке Server-Timing, всем — в гистограммы /metrics.
+    Ставится первым в MIDDLEWARE, чтобы учитывать и остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, metrics)
+        if hasattr(request, 'user') and request.user.is_staff:
+            self.add_server_timing(response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, metrics)
+        if hasattr(request, 'auser') and (await request.auser()).is_staff:
+            self.add_server_timing(response, metrics)
+        return response
+
+    def record(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        metrics.total_seconds = total
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        if view != 'metrics':
+            labels = {'view': view, 'lang': getattr(request, 'LANGUAGE_CODE', None) or get_language()}
+            store.observe('digitalem_request_duration_seconds', labels, total)
+            store.observe('digitalem_db_query_duration_seconds', labels, metrics.query_seconds)
+            store.observe('digitalem_db_queries', labels, metrics.queries)
+            store.observe('digitalem_template_render_seconds', labels, metrics.template_seconds)
+            store.increment('digitalem_responses_total', {**labels, 'status': f'{response.status_code // 100}xx'})
+            store.maybe_flush()
+
+    def add_server_timing(self, response, metrics):
+        response['Server-Timing'] = (
+            f'db;dur={metrics.query_seconds * 1000:.1f};desc="{metrics.queries} queries", '
+            f'tpl;dur={metrics.template_seconds * 1000:.1f}, '
+            f'total;dur={metrics.total_seconds * 1000:.1f}'
+        )
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_content_updated_at'),
+    ]
+
+    operations = [
+        # Полнотекстовый индекс SQLite FTS5 для main/search.py; заполняется командой rebuild_search_index
+        migrations.RunSQL(
+            sql="""
+                CREATE VIRTUAL TABLE main_search_index USING fts5(
+                    kind UNINDEXED,
+                    object_id UNINDEXED,
+                    url UNINDEXED,
+                    lang,
+                    title,
+                    body,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            """,
+            reverse_sql="DROP TABLE main_search_index",
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+# Модель -> префиксы rich-text полей (rich_text_fields): у исторических моделей этого атрибута нет
+RICH_TEXT_FIELDS = {
+    'project': ('full_description', 'task_description', 'result_description', 'detailed_info'),
+    'news': ('content',),
+    'teammember': ('bio',),
+    'publication': ('description',),
+}
+
+
+def fill_rich_text_html(apps, schema_editor):
+    # <поле>_html_<lang> для записей, сохранённых до 0008: страницы читают только их (TranslatableModel.get_html)
+    from main.rich_text import render_rich_text
+
+    languages = [code for code, _name in settings.LANGUAGES]
+    for model_name, prefixes in RICH_TEXT_FIELDS.items():
+        model = apps.get_model('main', model_name)
+        pairs = [(f"{prefix}_{code}", f"{prefix}_html_{code}") for prefix in prefixes for code in languages]
+        batch = []
+        for obj in model.objects.only('pk', *(name for pair in pairs for name in pair)).iterator(chunk_size=BATCH_SIZE):
+            changed = False
+            for source, html in pairs:
+                if getattr(obj, source) and not getattr(obj, html):
+                    setattr(obj, html, render_rich_text(getattr(obj, source)))
+                    changed = True
+            if changed:
+                batch.append(obj)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, [html for _source, html in pairs])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, [html for _source, html in pairs])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_news_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_rich_text_html, migrations.RunPython.noop),
+    ]
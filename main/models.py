@@ -1,20 +1,93 @@
+from html import escape
+
+from django.conf import settings
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from ckeditor_uploader.fields import RichTextUploadingField
 from django.utils.translation import get_language
+from .rich_text import render_rich_text
+from .utils import make_excerpt
+
+FALLBACK_LANGUAGE = 'ru'
+
+
+class TranslatableQuerySet(models.QuerySet):
+    def for_language(self, lang=None):
+        # Загружаем только колонки активного языка и запасной _ru, остальные переводы откладываем
+        lang = lang or get_language()
+        keep = {lang, FALLBACK_LANGUAGE}
+        deferred = [
+            field.attname for field in self.model._meta.concrete_fields
+            for code, _name in settings.LANGUAGES
+            if code not in keep and field.attname.endswith(f"_{code}")
+        ]
+        return self.defer(*deferred)
+
+    def defer_translations(self, *field_prefixes):
+        # Вместе с обработанным HTML <prefix>_html_<lang>, если он есть у модели
+        names = {field.attname for field in self.model._meta.concrete_fields}
+        return self.defer(*(
+            name
+            for prefix in field_prefixes for code, _name in settings.LANGUAGES
+            for name in (f"{prefix}_{code}", f"{prefix}_html_{code}") if name in names
+        ))
+
+    def defer_rich_text_sources(self):
+        # Исходный HTML из CKEditor: страницы выводят только обработанный <prefix>_html_<lang> (get_html)
+        return self.defer(*(
+            f"{prefix}_{code}" for prefix in self.model.rich_text_fields for code, _name in settings.LANGUAGES
+        ))
 
 
 class TranslatableModel(models.Model):
+    objects = TranslatableQuerySet.as_manager()
+
+    # Префикс rich-text поля, из которого считаются excerpt_<lang> (если у модели они есть)
+    excerpt_source = None
+    # Префиксы rich-text полей, для которых при сохранении записывается <prefix>_html_<lang> (main/rich_text.py)
+    rich_text_fields = ()
+
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        derived = set()
+        if self.excerpt_source:
+            self.update_excerpts()
+            derived |= {f"excerpt_{code}" for code, _name in settings.LANGUAGES}
+        if self.rich_text_fields:
+            self.update_rich_text()
+            derived |= {f"{prefix}_html_{code}" for prefix in self.rich_text_fields for code, _name in settings.LANGUAGES}
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and derived:
+            kwargs['update_fields'] = set(update_fields) | derived
+        super().save(*args, **kwargs)
+
+    def update_excerpts(self):
+        for code, _name in settings.LANGUAGES:
+            setattr(self, f"excerpt_{code}", make_excerpt(getattr(self, f"{self.excerpt_source}_{code}")))
+
+    def update_rich_text(self):
+        for prefix in self.rich_text_fields:
+            for code, _name in settings.LANGUAGES:
+                setattr(self, f"{prefix}_html_{code}", render_rich_text(getattr(self, f"{prefix}_{code}")))
+
     def get_tr(self, field_prefix):
         lang = get_language()
         val = getattr(self, f"{field_prefix}_{lang}", None)
         if not val:
-            val = getattr(self, f"{field_prefix}_ru", None)
+            val = getattr(self, f"{field_prefix}_{FALLBACK_LANGUAGE}", None)
         return val
 
+    def get_html(self, field_prefix):
+        # Обработанный HTML: считается при сохранении, у старых записей заполнен миграцией 0010
+        for code in (get_language(), FALLBACK_LANGUAGE):
+            val = getattr(self, f"{field_prefix}_html_{code}", None)
+            if val:
+                return val
+        return ''
+
 
 class Publication(TranslatableModel):
     member = models.ForeignKey('TeamMember', related_name='publications', on_delete=models.CASCADE,
@@ -34,19 +107,32 @@ class Publication(TranslatableModel):
     url = models.URLField(verbose_name="Ссылка на публикацию", blank=True)
     project = models.ForeignKey('Project', related_name='publications', on_delete=models.SET_NULL, null=True,
                                 blank=True, verbose_name="Связанный проект")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    description_html_ru = models.TextField(blank=True, editable=False)
+    description_html_kk = models.TextField(blank=True, editable=False)
+    description_html_en = models.TextField(blank=True, editable=False)
+
+    rich_text_fields = ('description',)
 
     @property
     def title(self): return self.get_tr('title')
 
     @property
-    def description(self): return self.get_tr('description')
+    def description(self): return self.get_html('description')
 
     def __str__(self): return self.title_ru
 
+    def get_absolute_url(self): return self.member.get_absolute_url()
+
     class Meta:
         verbose_name = "Публикация"
         verbose_name_plural = "Публикации"
         ordering = ['-publication_date', 'title_ru']
+        indexes = [
+            models.Index(fields=['member', '-publication_date', 'title_ru'], name='publication_member_date_idx'),
+            models.Index(fields=['project', '-publication_date', 'title_ru'], name='publication_project_date_idx'),
+        ]
 
 
 class TeamMember(TranslatableModel):
@@ -69,6 +155,13 @@ class TeamMember(TranslatableModel):
     photo = models.ImageField(upload_to='team_photos/', verbose_name="Фотография")
     scopus_id = models.CharField(max_length=50, blank=True, verbose_name="Scopus Author ID")
     orcid_id = models.CharField(max_length=50, blank=True, verbose_name="ORCID iD")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    bio_html_ru = models.TextField(blank=True, editable=False)
+    bio_html_kk = models.TextField(blank=True, editable=False)
+    bio_html_en = models.TextField(blank=True, editable=False)
+
+    rich_text_fields = ('bio',)
 
     @property
     def name(self): return self.get_tr('name')
@@ -77,19 +170,25 @@ class TeamMember(TranslatableModel):
     def position(self): return self.get_tr('position')
 
     @property
-    def bio(self): return self.get_tr('bio')
+    def bio(self): return self.get_html('bio')
 
     def __str__(self): return self.name_ru
 
     def get_absolute_url(self): return reverse('team_member_detail', kwargs={'slug': self.slug})
 
-    class Meta: verbose_name = "Сотрудник"; verbose_name_plural = "Сотрудники"
+    class Meta:
+        verbose_name = "Сотрудник"
+        verbose_name_plural = "Сотрудники"
+        indexes = [
+            models.Index(fields=['updated_at'], name='team_updated_idx'),
+        ]
 
 
 class SocialLink(models.Model):
     member = models.ForeignKey(TeamMember, related_name='social_links', on_delete=models.CASCADE)
     icon_class = models.CharField(max_length=50, verbose_name="CSS класс иконки")
     url = models.URLField(verbose_name="URL-адрес ссылки")
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self): return f"{self.member.name_ru} - {self.url}"
 
@@ -104,13 +203,20 @@ class ProjectFeature(TranslatableModel):
     text_kk = models.CharField(max_length=200, verbose_name="Текст особенности (KK)", blank=True)
     text_en = models.CharField(max_length=200, verbose_name="Текст особенности (EN)", blank=True)
     order = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     @property
     def text(self): return self.get_tr('text')
 
     def __str__(self): return f"{self.project.title_ru} - {self.text_ru}"
 
-    class Meta: verbose_name = "Особенность проекта"; verbose_name_plural = "Особенности проекта"; ordering = ['order']
+    class Meta:
+        verbose_name = "Особенность проекта"
+        verbose_name_plural = "Особенности проекта"
+        ordering = ['order']
+        indexes = [
+            models.Index(fields=['project', 'order'], name='feature_project_order_idx'),
+        ]
 
 
 class ProjectTechStack(models.Model):
@@ -118,10 +224,17 @@ class ProjectTechStack(models.Model):
     icon_class = models.CharField(max_length=100, verbose_name="CSS класс иконки")
     text = models.CharField(max_length=100, verbose_name="Название технологии")  # Технологии обычно не переводят
     order = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self): return f"{self.project.title_ru} - {self.text}"
 
-    class Meta: verbose_name = "Технология стека"; verbose_name_plural = "Технологический стек"; ordering = ['order']
+    class Meta:
+        verbose_name = "Технология стека"
+        verbose_name_plural = "Технологический стек"
+        ordering = ['order']
+        indexes = [
+            models.Index(fields=['project', 'order'], name='techstack_project_order_idx'),
+        ]
 
 
 class Project(TranslatableModel):
@@ -171,6 +284,27 @@ class Project(TranslatableModel):
     detailed_info_en = RichTextUploadingField(verbose_name="Доп. инфо (EN)", blank=True)
 
     keywords = models.CharField(max_length=200, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    excerpt_ru = models.TextField(blank=True, editable=False)
+    excerpt_kk = models.TextField(blank=True, editable=False)
+    excerpt_en = models.TextField(blank=True, editable=False)
+
+    full_description_html_ru = models.TextField(blank=True, editable=False)
+    full_description_html_kk = models.TextField(blank=True, editable=False)
+    full_description_html_en = models.TextField(blank=True, editable=False)
+    task_description_html_ru = models.TextField(blank=True, editable=False)
+    task_description_html_kk = models.TextField(blank=True, editable=False)
+    task_description_html_en = models.TextField(blank=True, editable=False)
+    result_description_html_ru = models.TextField(blank=True, editable=False)
+    result_description_html_kk = models.TextField(blank=True, editable=False)
+    result_description_html_en = models.TextField(blank=True, editable=False)
+    detailed_info_html_ru = models.TextField(blank=True, editable=False)
+    detailed_info_html_kk = models.TextField(blank=True, editable=False)
+    detailed_info_html_en = models.TextField(blank=True, editable=False)
+
+    excerpt_source = 'full_description'
+    rich_text_fields = ('full_description', 'task_description', 'result_description', 'detailed_info')
 
     @property
     def title(self): return self.get_tr('title')
@@ -185,25 +319,34 @@ class Project(TranslatableModel):
     def status_tag_2(self): return self.get_tr('status_tag_2')
 
     @property
-    def full_description(self): return self.get_tr('full_description')
+    def full_description(self): return self.get_html('full_description')
 
     @property
-    def task_description(self): return self.get_tr('task_description')
+    def task_description(self): return self.get_html('task_description')
 
     @property
     def task_subtitle(self): return self.get_tr('task_subtitle')
 
     @property
-    def result_description(self): return self.get_tr('result_description')
+    def result_description(self): return self.get_html('result_description')
 
     @property
-    def detailed_info(self): return self.get_tr('detailed_info')
+    def detailed_info(self): return self.get_html('detailed_info')
+
+    @property
+    def excerpt(self): return self.get_tr('excerpt')
 
     def __str__(self): return self.title_ru
 
     def get_absolute_url(self): return reverse('project_detail', kwargs={'slug': self.slug})
 
-    class Meta: verbose_name = "Проект"; verbose_name_plural = "Проекты"
+    class Meta:
+        verbose_name = "Проект"
+        verbose_name_plural = "Проекты"
+        indexes = [
+            models.Index(fields=['category'], name='project_category_idx'),
+            models.Index(fields=['updated_at'], name='project_updated_idx'),
+        ]
 
 
 class ProjectResultImage(TranslatableModel):
@@ -212,6 +355,7 @@ class ProjectResultImage(TranslatableModel):
     caption_ru = models.CharField(max_length=255, blank=True)
     caption_kk = models.CharField(max_length=255, blank=True)
     caption_en = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     @property
     def caption(self): return self.get_tr('caption')
@@ -249,17 +393,40 @@ class News(TranslatableModel):
     keywords = models.CharField(max_length=200, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    excerpt_ru = models.TextField(blank=True, editable=False)
+    excerpt_kk = models.TextField(blank=True, editable=False)
+    excerpt_en = models.TextField(blank=True, editable=False)
+
+    content_html_ru = models.TextField(blank=True, editable=False)
+    content_html_kk = models.TextField(blank=True, editable=False)
+    content_html_en = models.TextField(blank=True, editable=False)
+
+    excerpt_source = 'content'
+    rich_text_fields = ('content',)
+
     @property
     def title(self): return self.get_tr('title')
 
     @property
-    def content(self): return self.get_tr('content')
+    def content(self): return self.get_html('content')
+
+    @property
+    def excerpt(self): return self.get_tr('excerpt')
 
     def __str__(self): return self.title_ru
 
     def get_absolute_url(self): return reverse('news_detail', kwargs={'slug': self.slug})
 
-    class Meta: verbose_name = "Новость"; verbose_name_plural = "Новости"; ordering = ['-published_date']
+    class Meta:
+        verbose_name = "Новость"
+        verbose_name_plural = "Новости"
+        ordering = ['-published_date']
+        indexes = [
+            models.Index(fields=['-published_date', '-id'], name='news_published_idx'),
+            models.Index(fields=['project', '-published_date', '-id'], name='news_project_published_idx'),
+            models.Index(fields=['category', '-published_date', '-id'], name='news_category_published_idx'),
+            models.Index(fields=['updated_at'], name='news_updated_idx'),
+        ]
 
 
 class Service(TranslatableModel):
@@ -273,6 +440,7 @@ class Service(TranslatableModel):
 
     icon_class = models.CharField(max_length=100, blank=True)
     order = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     @property
     def title(self): return self.get_tr('title')
@@ -280,6 +448,49 @@ class Service(TranslatableModel):
     @property
     def description(self): return self.get_tr('description')
 
-    class Meta: verbose_name = "Услуга"; verbose_name_plural = "Услуги"; ordering = ['order']
+    class Meta:
+        verbose_name = "Услуга"
+        verbose_name_plural = "Услуги"
+        ordering = ['order']
+        indexes = [
+            models.Index(fields=['order'], name='service_order_idx'),
+            models.Index(fields=['updated_at'], name='service_updated_idx'),
+        ]
+
+    def __str__(self): return self.title_ru
+
+
+class ContactMessage(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [(STATUS_PENDING, 'В очереди'), (STATUS_SENT, 'Отправлено'), (STATUS_DEAD, 'Не доставлено')]
 
-    def __str__(self): return self.title_ru
\ No newline at end of file
+    name = models.CharField(max_length=200, verbose_name="Имя")
+    phone = models.CharField(max_length=50, verbose_name="Телефон")
+    email = models.EmailField(verbose_name="Email")
+    message = models.TextField(verbose_name="Сообщение")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Статус")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток отправки")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Следующая попытка")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Получено")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Отправлено")
+
+    def telegram_text(self):
+        return (
+            f"<b>Новая заявка с сайта!</b>\n\n"
+            f"<b>Имя:</b> {escape(self.name)}\n"
+            f"<b>Телефон:</b> {escape(self.phone)}\n"
+            f"<b>Email:</b> {escape(self.email)}\n\n"
+            f"<b>Сообщение:</b>\n{escape(self.message)}"
+        )
+
+    def __str__(self): return f"{self.name} <{self.email}>"
+
+    class Meta:
+        verbose_name = "Заявка с сайта"
+        verbose_name_plural = "Заявки с сайта"
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='contact_outbox_idx')]
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+import telegram
+from django.utils import timezone
+
+from .models import ContactMessage
+from .utils import is_database_locked
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=1)
+# Повторы записи результата отправки, если база занята: 0.5 + 1 + 2 + 4 с
+SAVE_RETRIES = 5
+SAVE_RETRY_DELAY = 0.5
+RESULT_FIELDS = ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+class OutboxDispatcher:
+    """
+    Отправляет накопленные ContactMessage в Telegram одним переиспользуемым клиентом.
+    Неудачные попытки откладываются с экспоненциальной задержкой, после MAX_ATTEMPTS
+    (или если Telegram отклонил само сообщение) заявка помечается как недоставленная.
+    Попытка записывается в базу до отправки, а результат — с повторами при занятой базе:
+    принятое Telegram сообщение не уходит повторно в следующем цикле.
+    """
+
+    def __init__(self, bot, chat_id, batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+    async def run(self, interval=5, once=False):
+        while True:
+            try:
+                processed = await self.dispatch_batch()
+            except Exception as e:
+                if not is_database_locked(e):
+                    raise
+                # База занята записью из админки: пропускаем цикл, заявки останутся в очереди
+                logger.warning("Outbox: database is locked, retrying in %s s", interval)
+                processed = 0
+            if not processed:
+                if once:
+                    return
+                await asyncio.sleep(interval)
+
+    async def dispatch_batch(self):
+        due = (
+            ContactMessage.objects
+            .filter(status=ContactMessage.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:self.batch_size]
+        )
+        batch = [message async for message in due]
+        await asyncio.gather(*(self.deliver(message) for message in batch))
+        return len(batch)
+
+    async def deliver(self, message):
+        # Попытка занимает заявку до конца задержки: если результат так и не запишется,
+        # повторная отправка будет не раньше, чем через backoff
+        message.attempts += 1
+        message.next_attempt_at = timezone.now() + backoff(message.attempts)
+        await message.asave(update_fields=['attempts', 'next_attempt_at'])
+        try:
+            await self.bot.send_message(chat_id=self.chat_id, text=message.telegram_text(), parse_mode='HTML')
+        except telegram.error.BadRequest as e:
+            self._dead_letter(message, e)
+        except telegram.error.RetryAfter as e:
+            retry_after = e.retry_after
+            if not isinstance(retry_after, timedelta):
+                retry_after = timedelta(seconds=retry_after)
+            self._retry(message, e, retry_after)
+        except telegram.error.TelegramError as e:
+            self._retry(message, e, backoff(message.attempts))
+        else:
+            message.status = ContactMessage.STATUS_SENT
+            message.sent_at = timezone.now()
+            message.last_error = ''
+        await self._save_result(message)
+
+    async def _save_result(self, message):
+        # Telegram уже ответил: результат нужно записать, даже если база занята записью из админки
+        for attempt in range(SAVE_RETRIES):
+            try:
+                await message.asave(update_fields=RESULT_FIELDS)
+                return
+            except Exception as e:
+                if not is_database_locked(e) or attempt == SAVE_RETRIES - 1:
+                    raise
+                await asyncio.sleep(SAVE_RETRY_DELAY * 2 ** attempt)
+
+    def _retry(self, message, error, delay):
+        if message.attempts >= self.max_attempts:
+            self._dead_letter(message, error)
+            return
+        message.next_attempt_at = timezone.now() + delay
+        message.last_error = f"{type(error).__name__}: {error}"
+
+    def _dead_letter(self, message, error):
+        message.status = ContactMessage.STATUS_DEAD
+        message.last_error = f"{type(error).__name__}: {error}"
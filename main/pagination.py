@@ -0,0 +1,122 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Пагинация по ключу (cursor) вместо OFFSET: страница выбирается условием
+    WHERE (a, b) < (:a, :b), поэтому глубокие страницы стоят столько же, сколько первая.
+    Все поля ordering должны идти в одном направлении, последнее поле должно быть уникальным.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        descending = {field.startswith('-') for field in ordering}
+        if len(descending) != 1:
+            raise ValueError("Keyset ordering fields must share one direction")
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.descending = descending.pop()
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.per_page = per_page
+
+    def page(self, after=None, before=None):
+        queryset, build = self._plan(after, before)
+        return build(list(queryset))
+
+    async def apage(self, after=None, before=None):
+        queryset, build = self._plan(after, before)
+        return build([obj async for obj in queryset])
+
+    def _plan(self, after, before):
+        # Запрос и функция сборки страницы отдельно, чтобы page() и apage() делили логику
+        if before is not None:
+            values = self.decode_cursor(before)
+            if values is not None:
+                return self._before_queryset(values), self._before_page
+        values = self.decode_cursor(after) if after is not None else None
+        return self._after_queryset(values), lambda items: self._after_page(items, values is not None)
+
+    def _after_queryset(self, values):
+        queryset = self.queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward=True))
+        return queryset[:self.per_page + 1]
+
+    def _after_page(self, items, from_cursor):
+        has_next = len(items) > self.per_page
+        items = items[:self.per_page]
+        return KeysetPage(
+            items,
+            next_cursor=self.encode_cursor(items[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor(items[0]) if from_cursor and items else None,
+        )
+
+    def _before_queryset(self, values):
+        reverse_ordering = [field[1:] if field.startswith('-') else f"-{field}" for field in self.ordering]
+        queryset = self.queryset.order_by(*reverse_ordering).filter(self._seek(values, forward=False))
+        return queryset[:self.per_page + 1]
+
+    def _before_page(self, items):
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page][::-1]
+        return KeysetPage(
+            items,
+            next_cursor=self.encode_cursor(items[-1]) if items else None,
+            previous_cursor=self.encode_cursor(items[0]) if has_previous else None,
+        )
+
+    def _seek(self, values, forward):
+        # Лексикографическое сравнение кортежа (f1, f2, ...) с курсором
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            step = Q(**{f"{field}__{lookup}": values[i]})
+            for prev_field, prev_value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{prev_field: prev_value})
+            condition |= step
+        # Нестрогая граница по первому полю даёт SQLite диапазон по индексу перед разбором OR
+        return Q(**{f"{self.fields[0]}__{lookup}e": values[0]}) & condition
+
+    def encode_cursor(self, obj):
+        values = [str(getattr(obj, field)) for field in self.fields]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                return None
+            model_fields = [self.queryset.model._meta.get_field(field) for field in self.fields]
+            return [field.to_python(value) for field, value in zip(model_fields, values)]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
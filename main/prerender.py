@@ -0,0 +1,188 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.test import Client
+from django.urls import reverse
+
+from .cache import CSRF_INPUT_RE
+from .models import (
+    News, Project, ProjectFeature, ProjectResultImage, ProjectTechStack, Publication, Service, SocialLink,
+    TeamMember,
+)
+from .staticfiles import compress
+
+logger = logging.getLogger(__name__)
+
+LANGUAGE_CODES = [code for code, _name in settings.LANGUAGES]
+PAGE_FILENAME = 'index.html'
+
+_pending = threading.local()
+_client = None
+
+
+def base_url():
+    # Адрес сайта для абсолютных ссылок в страницах (кнопки «поделиться» новостей)
+    return settings.PRERENDER_BASE_URL or f"https://{settings.ALLOWED_HOSTS[0]}"
+
+
+def list_urls():
+    return {
+        reverse('index'),
+        reverse('labs'),
+        reverse('news_list'),
+        reverse('team_list'),
+        *(reverse('project_list', kwargs={'category_slug': slug}) for slug, _name in Project.CATEGORY_CHOICES),
+    }
+
+
+def page_urls():
+    """Все публичные страницы без параметров запроса (первые страницы списков)."""
+    return list_urls() | {
+        reverse(name, kwargs={'slug': slug})
+        for name, model in (('project_detail', Project), ('news_detail', News), ('team_member_detail', TeamMember))
+        for slug in model.objects.values_list('slug', flat=True)
+    }
+
+
+def _details(name, slugs):
+    return {reverse(name, kwargs={'slug': slug}) for slug in slugs if slug}
+
+
+def _project_pages(project_id):
+    return _details('project_detail', Project.objects.filter(pk=project_id).values_list('slug', flat=True))
+
+
+def _member_pages(member_ids):
+    return _details('team_member_detail', TeamMember.objects.filter(pk__in=member_ids).values_list('slug', flat=True))
+
+
+def affected_urls(instance):
+    """
+    Страницы, на которых виден объект: его страница и списки, главная и страницы связанных объектов.
+    Вызывается из сигналов до коммита, пока связи удалённого объекта ещё известны.
+    """
+    categories = {reverse('project_list', kwargs={'category_slug': slug}) for slug, _name in Project.CATEGORY_CHOICES}
+    if isinstance(instance, Project):
+        # Список прежней категории тоже меняется, поэтому перерисовываются все категории
+        return {instance.get_absolute_url(), *categories,
+                *_member_pages(instance.team.values_list('pk', flat=True))}
+    if isinstance(instance, (ProjectFeature, ProjectTechStack)):
+        return _project_pages(instance.project_id) | categories
+    if isinstance(instance, ProjectResultImage):
+        return _project_pages(instance.project_id)
+    if isinstance(instance, News):
+        return {instance.get_absolute_url(), reverse('news_list'), reverse('index'),
+                *_project_pages(instance.project_id)}
+    if isinstance(instance, TeamMember):
+        return {instance.get_absolute_url(), reverse('team_list'), reverse('index'),
+                *_details('project_detail', instance.projects.values_list('slug', flat=True))}
+    if isinstance(instance, SocialLink):
+        return _member_pages([instance.member_id])
+    if isinstance(instance, Publication):
+        return _member_pages([instance.member_id]) | _project_pages(instance.project_id)
+    if isinstance(instance, Service):
+        return {reverse('index')}
+    return set()
+
+
+def page_path(lang, url):
+    return os.path.join(settings.PRERENDER_ROOT, lang, *url.strip('/').split('/'), PAGE_FILENAME)
+
+
+def write_page(path, content):
+    # Атомарно: nginx не должен отдать недописанный файл; .gz/.br — для gzip_static/brotli_static
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    variants = {'': content, **{suffix: data for suffix, data in compress(content).items() if len(data) < len(content)}}
+    for suffix, data in variants.items():
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as output:
+            output.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path + suffix)
+
+
+def remove_page(path):
+    for suffix in ('', '.gz', '.br'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def render_page(task):
+    """Рендерит url на языке lang и записывает файл. Возвращает (lang, url, статус, размер)."""
+    global _client
+    lang, url = task
+    if _client is None:
+        _client = Client(HTTP_HOST=urlsplit(base_url()).netloc)
+    _client.cookies[settings.LANGUAGE_COOKIE_NAME] = lang
+    response = _client.get(url, secure=urlsplit(base_url()).scheme == 'https')
+    path = page_path(lang, url)
+    if response.status_code == 404:
+        remove_page(path)
+        return lang, url, 404, 0
+    if response.status_code != 200:
+        return lang, url, response.status_code, 0
+    # Токен CSRF уникален для посетителя: static/js/script.js подставляет его из cookie или /csrf/
+    content = CSRF_INPUT_RE.sub(rb'\1\2', response.content)
+    write_page(path, content)
+    return lang, url, 200, len(content)
+
+
+def render_pages(urls, processes=1):
+    """Рендерит urls на всех языках, с processes > 1 — в пуле процессов. Возвращает результаты render_page."""
+    tasks = [(lang, url) for url in sorted(urls) for lang in LANGUAGE_CODES]
+    if processes <= 1:
+        return [render_page(task) for task in tasks]
+    # Дочерние процессы не должны делить с родителем открытые соединения с базой
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(processes, mp_context=context) as executor:
+        return list(executor.map(render_page, tasks, chunksize=max(1, len(tasks) // (processes * 4))))
+
+
+def prune(urls):
+    """Удаляет файлы страниц, которых больше нет (удалённые объекты, сменившийся slug)."""
+    keep = {page_path(lang, url) for url in urls for lang in LANGUAGE_CODES}
+    removed = 0
+    for root, _dirs, files in os.walk(settings.PRERENDER_ROOT):
+        path = os.path.join(root, PAGE_FILENAME)
+        if PAGE_FILENAME in files and path not in keep:
+            remove_page(path)
+            removed += 1
+    return removed
+
+
+def collect_affected(instance, related=()):
+    pending = getattr(_pending, 'urls', None)
+    if pending is None:
+        pending = _pending.urls = set()
+    pending.update(affected_urls(instance))
+    pending.update(obj.get_absolute_url() for obj in related)
+
+
+def prerender_changed(instance, related=()):
+    """
+    Вызывается из сигналов при PRERENDER_ON_SAVE: после коммита (и после публикации снимка,
+    колбэк которого зарегистрирован раньше) перерисовывает страницы объекта и related один раз на транзакцию.
+    При удалении связи известны только до него: pre_delete вызывает collect_affected; при смене родителя
+    или slug pre_save передаёт в collect_affected прежнюю версию объекта.
+    """
+    collect_affected(instance, related)
+    transaction.on_commit(_render_pending)
+
+
+def _render_pending():
+    urls = set(_pending.urls)
+    _pending.urls.clear()
+    if urls:
+        # Адреса удалённых объектов и прежние адреса после смены slug отдают 404: render_page удаляет их файлы.
+        # Полная чистка PRERENDER_ROOT — в команде prerender
+        failed = [(lang, url, status) for lang, url, status, _size in render_pages(urls) if status not in (200, 404)]
+        if failed:
+            logger.error("Prerender failed, previous files are kept: %s", failed)
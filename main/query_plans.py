@@ -0,0 +1,126 @@
+import datetime
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from .models import (
+    News, Project, ProjectResultImage, ProjectTechStack, Publication, Service, SocialLink, TeamMember
+)
+from .views import news_paginator, team_paginator
+
+SAMPLE_SLUG = 'query-plan-check'
+
+# Сортировка во временном B-дереве (count(DISTINCT) в отметках изменения — не сортировка)
+TEMP_SORT_RE = re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF |LAST TERM OF )?(?:ORDER BY|GROUP BY|DISTINCT)')
+# Обход таблицы без индекса: без USING INDEX / PRIMARY KEY / VIRTUAL TABLE в строке плана
+FULL_SCAN_RE = re.compile(r'^SCAN (?!CONSTANT ROW|\()\S+(?: AS \S+)?$')
+LIMIT_RE = re.compile(r'\bLIMIT\b')
+
+
+def hot_urls(sample):
+    """Публичные страницы, запросы которых проверяются (включая prefetch и отметки conditional GET)."""
+    member, project, news = sample['member'], sample['project'], sample['news']
+    return [
+        reverse('index'),
+        reverse('team_list'),
+        f"{reverse('team_list_more')}?after={team_paginator().encode_cursor(member)}",
+        reverse('project_list', kwargs={'category_slug': project.category}),
+        reverse('project_detail', kwargs={'slug': project.slug}),
+        reverse('team_member_detail', kwargs={'slug': member.slug}),
+        reverse('news_list'),
+        f"{reverse('news_list_more')}?after={news_paginator().encode_cursor(news)}",
+        f"{reverse('news_list')}?before={news_paginator().encode_cursor(news)}",
+        reverse('news_detail', kwargs={'slug': news.slug}),
+        f"{reverse('search')}?q=query",
+        reverse('news_feed', kwargs={'lang': 'ru', 'feed_format': 'rss'}),
+        reverse('news_category_feed', kwargs={'lang': 'ru', 'feed_format': 'atom', 'category': news.category}),
+        reverse('project_news_feed', kwargs={'lang': 'ru', 'feed_format': 'rss', 'slug': project.slug}),
+        f"{reverse('api_list', kwargs={'resource': 'projects'})}?fields=title,team,features,tech_stack,result_images",
+        f"{reverse('api_list', kwargs={'resource': 'news'})}?fields=title,project&after={news_paginator().encode_cursor(news)}",
+        f"{reverse('api_detail', kwargs={'resource': 'team', 'slug': member.slug})}?fields=name,social_links,projects,publications",
+        f"{reverse('api_list', kwargs={'resource': 'publications'})}?fields=title,member,project&member={member.slug}",
+        reverse('api_list', kwargs={'resource': 'services'}),
+    ]
+
+
+def create_sample():
+    # По две записи там, где prefetch выбирает по project_id IN (...): план для списка из нескольких id
+    members = [
+        TeamMember.objects.create(name_ru="Query plan", slug=f'{SAMPLE_SLUG}-{i}', photo='team_photos/sample.jpg')
+        for i in range(2)
+    ]
+    projects = [
+        Project.objects.create(title_ru="Query plan", slug=f'{SAMPLE_SLUG}-{i}', tagline_ru="-",
+                               full_description_ru="<p>query</p>", category='research')
+        for i in range(2)
+    ]
+    news = []
+    for i, project in enumerate(projects):
+        project.team.set(members)
+        ProjectTechStack.objects.create(project=project, icon_class='fa', text="Python")
+        ProjectResultImage.objects.create(project=project, image='project_results/sample.png')
+        news.append(News.objects.create(
+            title_ru="Query plan", slug=f'{SAMPLE_SLUG}-{i}', image='news_images/sample.png',
+            content_ru="<p>query</p>", published_date=datetime.date(2000, 1, 1 + i), project=project,
+        ))
+        Publication.objects.create(member=members[0], project=project, title_ru="Query plan", source="-",
+                                   publication_date=datetime.date(2000, 1, 1))
+    SocialLink.objects.create(member=members[0], icon_class='fa', url='https://example.com')
+    Service.objects.create(title_ru="Query plan", description_ru="-")
+    return {'member': members[0], 'project': projects[0], 'news': news[0]}
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(sql, plan):
+    """
+    Строки плана, которые считаются регрессией: сортировка во временном B-дереве и обход таблицы
+    без индекса. Обход по rowid допускается только с LIMIT и без сортировки — он останавливается
+    после LIMIT строк (так выбираются видимые сотрудники: фильтр по булеву полю индекс не использует).
+    Сортировка по bm25() в полнотекстовом поиске неизбежна: LIMIT оставляет из неё SEARCH_LIMIT строк.
+    """
+    ranked = any('VIRTUAL TABLE' in detail for detail in plan)
+    problems = [detail for detail in plan if TEMP_SORT_RE.search(detail) and not ranked]
+    if problems or not LIMIT_RE.search(sql):
+        problems += [detail for detail in plan if FULL_SCAN_RE.match(detail)]
+    return problems
+
+
+def collect_plans():
+    """
+    Открывает hot_urls тестовым клиентом на временных данных (транзакция откатывается) без кэша
+    страниц и без снимка базы и возвращает [(url, sql, plan, problems)] для каждого уникального SELECT.
+    """
+    results = []
+    seen = set()
+    dummy_cache = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    with override_settings(CACHES=dummy_cache, DATABASE_ROUTERS=[], ALLOWED_HOSTS=['testserver']):
+        with transaction.atomic():
+            client = Client()
+            for url in hot_urls(create_sample()):
+                queries = []
+
+                def capture(execute, sql, params, many, context):
+                    queries.append((sql, params))
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(capture):
+                    response = client.get(url)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{url} вернул {response.status_code}")
+                for sql, params in queries:
+                    if not sql.lstrip().upper().startswith('SELECT') or sql in seen:
+                        continue
+                    seen.add(sql)
+                    plan = explain(sql, params)
+                    results.append((url, sql, plan, plan_problems(sql, plan)))
+            transaction.set_rollback(True)
+    return results
@@ -0,0 +1,160 @@
+import posixpath
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, UnidentifiedImageError
+
+from .images import (
+    DERIVATIVE_WIDTHS, closest_derivative, derivative_name, derivative_widths, generate_derivatives, has_derivatives,
+)
+
+# EXIF Orientation, при которых картинка повёрнута на 90°: ширина и высота меняются местами
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def media_name(src):
+    """Имя файла в default_storage для ссылки на MEDIA_URL (в том числе абсолютной на свой домен) или None."""
+    parts = urlsplit(src or '')
+    if parts.netloc and parts.netloc not in settings.ALLOWED_HOSTS:
+        return None
+    media_path = urlsplit(settings.MEDIA_URL).path
+    if not parts.path.startswith(media_path):
+        return None
+    name = posixpath.normpath(unquote(parts.path[len(media_path):]))
+    return None if name.startswith('..') else name
+
+
+def image_info(name, storage=default_storage):
+    """(ширина, высота, анимированное ли) с учётом поворота из EXIF или None, если это не картинка."""
+    # Image.open читает только заголовок файла
+    try:
+        with storage.open(name) as source:
+            image = Image.open(source)
+            width, height = image.size
+            if image.getexif().get(0x0112) in ROTATED_ORIENTATIONS:
+                width, height = height, width
+            return width, height, getattr(image, 'is_animated', False)
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        return None
+
+
+def css_pixels(style, prop):
+    # Размер, который CKEditor пишет в style="width:500px; height:300px"
+    for declaration in (style or '').split(';'):
+        name, _, value = declaration.partition(':')
+        value = value.strip().lower()
+        if name.strip().lower() == prop and value.endswith('px'):
+            try:
+                return round(float(value[:-2]))
+            except ValueError:
+                return None
+    return None
+
+
+def _attrs(attrs):
+    return ''.join(f' {name}' if value is None else f' {name}="{escape(value)}"' for name, value in attrs)
+
+
+def _srcset(name, width, ext):
+    # Копия в размере оригинала идёт в srcset с настоящей шириной, а не с шириной из имени
+    return ', '.join(
+        f"{default_storage.url(derivative_name(name, derivative_width, ext))} {actual}w"
+        for derivative_width, actual in derivative_widths(width)
+    )
+
+
+class RichTextRewriter(HTMLParser):
+    """
+    Переписывает HTML из CKEditor без изменения остальной разметки: у <img> появляются
+    width/height, loading="lazy", decoding="async", а картинки из MEDIA_URL заворачиваются в <picture>
+    с WebP/JPEG копиями из main.images (как тег responsive_image).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.output = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'img':
+            self.output.append(self.rewrite_image(attrs))
+        else:
+            self.output.append(self.get_starttag_text())
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self.output.append(f'</{tag}>')
+
+    def handle_data(self, data):
+        self.output.append(data)
+
+    def handle_entityref(self, name):
+        self.output.append(f'&{name};')
+
+    def handle_charref(self, name):
+        self.output.append(f'&#{name};')
+
+    def handle_comment(self, data):
+        self.output.append(f'<!--{data}-->')
+
+    def handle_decl(self, decl):
+        self.output.append(f'<!{decl}>')
+
+    def handle_pi(self, data):
+        self.output.append(f'<?{data}>')
+
+    def unknown_decl(self, data):
+        self.output.append(f'<![{data}]>')
+
+    def rewrite_image(self, attrs):
+        values = dict(attrs)
+        name = media_name(values.get('src'))
+        info = image_info(name) if name else None
+        extra = [('loading', 'lazy'), ('decoding', 'async')]
+        if info is None:
+            return f'<img{_attrs(attrs + [item for item in extra if item[0] not in values])}>'
+
+        intrinsic_width, intrinsic_height, animated = info
+        # Размер показа, если его задали в редакторе, иначе собственный; пропорции — от оригинала
+        width = css_pixels(values.get('style'), 'width') or _int(values.get('width')) or intrinsic_width
+        height = (css_pixels(values.get('style'), 'height') or _int(values.get('height'))
+                  or round(intrinsic_height * width / intrinsic_width))
+        extra += [('width', str(width)), ('height', str(height))]
+        extra = [item for item in extra if item[0] not in values]
+
+        # Анимацию копии WebP/JPEG не сохраняют
+        if animated or not (generate_derivatives(name) or has_derivatives(name)):
+            return f'<img{_attrs(attrs + extra)}>'
+
+        sizes = f"(max-width: {width}px) 100vw, {width}px"
+        middle_width = closest_derivative(DERIVATIVE_WIDTHS[len(DERIVATIVE_WIDTHS) // 2], intrinsic_width)
+        image_attrs = [
+            ('src', default_storage.url(derivative_name(name, middle_width, 'jpg'))),
+            ('srcset', _srcset(name, intrinsic_width, 'jpg')),
+            ('sizes', sizes),
+            *((key, value) for key, value in attrs if key not in ('src', 'srcset', 'sizes')),
+            *extra,
+        ]
+        return (f'<picture><source type="image/webp" srcset="{escape(_srcset(name, intrinsic_width, "webp"))}" '
+                f'sizes="{sizes}"><img{_attrs(image_attrs)}></picture>')
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def render_rich_text(value):
+    """HTML для шаблонов: результат RichTextRewriter. Пустое значение остаётся пустым."""
+    if not value:
+        return ''
+    rewriter = RichTextRewriter()
+    rewriter.feed(value)
+    rewriter.close()
+    return ''.join(rewriter.output)
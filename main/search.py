@@ -0,0 +1,205 @@
+import re
+from html import escape
+
+from django.conf import settings
+from django.db import connection, connections, router, transaction
+from django.db.models.expressions import RawSQL
+from django.utils.translation import get_language, gettext_lazy as _
+
+from .models import FALLBACK_LANGUAGE, News, Project, Publication, TeamMember
+from .utils import html_to_text
+
+SEARCH_TABLE = 'main_search_index'
+SEARCH_LIMIT = 20
+SNIPPET_WORDS = 24
+TITLE_WEIGHT = 10.0
+REBUILD_BATCH_SIZE = 500
+INSERT_SQL = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, url, lang, title, body) "
+    f"VALUES (%s, %s, %s, %s, %s, %s, %s)"
+)
+
+# Вид документа -> (модель, поле-заголовок, переводимые поля текста, обычные поля текста)
+DOCUMENTS = {
+    'project': (Project, 'title', ('tagline', 'full_description', 'task_description', 'result_description'),
+                ('keywords',)),
+    'news': (News, 'title', ('content',), ('keywords',)),
+    'member': (TeamMember, 'name', ('position', 'bio'), ()),
+    'publication': (Publication, 'title', ('description',), ('source',)),
+}
+KIND_BY_MODEL = {model: kind for kind, (model, *_rest) in DOCUMENTS.items()}
+KIND_LABELS = {'project': _('Проект'), 'news': _('Новость'), 'member': _('Сотрудник'), 'publication': _('Публикация')}
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+class SearchResult:
+    def __init__(self, kind, url, title, snippet):
+        self.kind = kind
+        self.url = url
+        self.title = title
+        self.snippet = snippet
+
+    @property
+    def kind_label(self):
+        return KIND_LABELS[self.kind]
+
+
+def _languages():
+    return [code for code, _name in settings.LANGUAGES]
+
+
+def _rowid(kind, pk, lang):
+    # rowid однозначно задаёт (вид, объект, язык): обновление и удаление идут по первичному ключу FTS5,
+    # а вид и id объекта вычисляются из rowid без чтения строки
+    return (pk * len(DOCUMENTS) + list(DOCUMENTS).index(kind)) * len(_languages()) + _languages().index(lang)
+
+
+def _translated(instance, prefix, lang):
+    return getattr(instance, f"{prefix}_{lang}", '') or getattr(instance, f"{prefix}_{FALLBACK_LANGUAGE}", '')
+
+
+def is_indexed(instance):
+    return not isinstance(instance, TeamMember) or instance.is_visible
+
+
+def document_rows(instance):
+    kind = KIND_BY_MODEL[type(instance)]
+    _model, title_field, translated_fields, plain_fields = DOCUMENTS[kind]
+    plain = [getattr(instance, field) or '' for field in plain_fields]
+    url = instance.get_absolute_url()
+    texts = {}  # без перевода язык получает текст ru: HTML разбираем один раз
+    for lang, _name in settings.LANGUAGES:
+        body = []
+        for field in translated_fields:
+            value = _translated(instance, field, lang)
+            if value not in texts:
+                texts[value] = html_to_text(value)
+            body.append(texts[value])
+        yield (
+            _rowid(kind, instance.pk, lang), kind, instance.pk, url, lang,
+            _translated(instance, title_field, lang), ' '.join(filter(None, body + plain)),
+        )
+
+
+def index_object(instance):
+    remove_object(instance)
+    if is_indexed(instance):
+        with connection.cursor() as cursor:
+            cursor.executemany(INSERT_SQL, list(document_rows(instance)))
+
+
+def remove_object(instance):
+    kind = KIND_BY_MODEL[type(instance)]
+    rowids = [_rowid(kind, instance.pk, lang) for lang, _name in settings.LANGUAGES]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(rowids))})", rowids
+        )
+
+
+def rebuild_index(batch_size=REBUILD_BATCH_SIZE):
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        for kind, (model, *_fields) in DOCUMENTS.items():
+            queryset = model.objects.all()
+            if model is TeamMember:
+                queryset = queryset.filter(is_visible=True)
+            elif model is Publication:
+                queryset = queryset.select_related('member')
+            rows = []
+            for instance in queryset.iterator(chunk_size=batch_size):
+                rows.extend(document_rows(instance))
+                if len(rows) >= batch_size:
+                    cursor.executemany(INSERT_SQL, rows)
+                    total += len(rows)
+                    rows = []
+            cursor.executemany(INSERT_SQL, rows)
+            total += len(rows)
+        # Сливаем сегменты индекса в один: меньше b-деревьев на каждый MATCH
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def match_expression(query, lang=None):
+    # Пользовательский ввод не попадает в синтаксис FTS5: только слова в кавычках с поиском по префиксу
+    tokens = TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return ''
+    expression = ' '.join(f'"{token}"*' for token in tokens)
+    return f'lang : "{lang}" AND ({expression})' if lang else expression
+
+
+def matching_ids(model, query):
+    # Подзапрос с id объектов модели, найденных на любом языке (для queryset.filter(pk__in=...));
+    # выполняется в той же базе, что и внешний queryset
+    languages, kinds = len(_languages()), len(DOCUMENTS)
+    return RawSQL(
+        f"SELECT DISTINCT rowid / {languages * kinds} FROM {SEARCH_TABLE} "
+        f"WHERE {SEARCH_TABLE} MATCH %s AND (rowid / {languages}) %% {kinds} = %s",
+        [match_expression(query), list(DOCUMENTS).index(KIND_BY_MODEL[model])],
+    )
+
+
+def _highlight_re(query):
+    # Те же префиксы, что и в запросе (match_expression)
+    prefixes = sorted(set(TOKEN_RE.findall(query.lower())), key=len, reverse=True)
+    return re.compile(rf"\b(?:{'|'.join(map(re.escape, prefixes))})\w*", re.IGNORECASE)
+
+
+def _highlight(text, pattern):
+    parts, position = [], 0
+    for match in pattern.finditer(text):
+        parts += [escape(text[position:match.start()]), '<mark>', escape(match.group()), '</mark>']
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return ''.join(parts)
+
+
+def _snippet(text, pattern, words=SNIPPET_WORDS):
+    # Окно из words слов вокруг первого совпадения
+    match = pattern.search(text)
+    start = text.rfind(' ', 0, max(match.start() - 60, 0)) + 1 if match else 0
+    fragment = text[start:start + words * 30].split(' ')
+    snippet = ' '.join(fragment[:words])
+    prefix = '… ' if start else ''
+    suffix = ' …' if len(fragment) > words else ''
+    return f"{prefix}{_highlight(snippet, pattern)}{suffix}"
+
+
+def search(query, lang=None, limit=SEARCH_LIMIT):
+    """
+    Поиск по индексу в активном языке: ранжирование BM25 (заголовок весит больше текста),
+    подсвеченные заголовок и фрагмент. Возвращает список SearchResult; к таблицам моделей не обращается.
+    """
+    lang = lang or get_language()
+    expression = match_expression(query, lang)
+    if not expression:
+        return []
+
+    # Индекс читается из той же базы, что и модели (снимок на публичных страницах, см. main/snapshot.py)
+    with connections[router.db_for_read(Project)].cursor() as cursor:
+        # BM25 по всем совпадениям: отсечение по rowid оставляло бы объекты с большими id любого вида,
+        # а не самые подходящие. Из отсортированного выбираются только limit строк
+        cursor.execute(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            f"ORDER BY bm25({SEARCH_TABLE}, 0, 0, 0, 0, %s, 1.0) LIMIT %s",
+            [expression, TITLE_WEIGHT, limit],
+        )
+        rowids = [rowid for rowid, in cursor.fetchall()]
+        if not rowids:
+            return []
+        # highlight()/snippet() из FTS5 заново разбирают весь список позиций слова, поэтому текст
+        # найденных строк читаем по rowid и подсвечиваем сами
+        cursor.execute(
+            f"SELECT rowid, kind, url, title, body FROM {SEARCH_TABLE} "
+            f"WHERE rowid IN ({', '.join(['%s'] * len(rowids))})", rowids,
+        )
+        documents = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    pattern = _highlight_re(query)
+    return [
+        SearchResult(kind, url, _highlight(title, pattern), _snippet(body, pattern))
+        for kind, url, title, body in (documents[rowid] for rowid in rowids if rowid in documents)
+    ]
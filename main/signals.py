@@ -1,18 +1,181 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
 from django.dispatch import receiver
-from .models import Project, ProjectFeature
+from django.utils import timezone
+from .snapshot import content_changed
+from .prerender import collect_affected, prerender_changed
+from .images import generate_derivatives
+from .models import (
+    Project, ProjectFeature, ProjectTechStack, ProjectResultImage,
+    News, TeamMember, SocialLink, Publication, Service
+)
 from .defaults import DEFAULT_FEATURES
+from .search import KIND_BY_MODEL, index_object, remove_object
+
+CONTENT_MODELS = (
+    Project, ProjectFeature, ProjectTechStack, ProjectResultImage,
+    News, TeamMember, SocialLink, Publication, Service,
+)
+
+# Записи, которые редактируются inline внутри родителя: их изменение обновляет updated_at родителя,
+# чтобы ETag/Last-Modified страницы родителя менялись вместе с ними
+PARENT_FIELDS = {
+    ProjectFeature: ('project',),
+    ProjectTechStack: ('project',),
+    ProjectResultImage: ('project',),
+    SocialLink: ('member',),
+    Publication: ('member', 'project'),
+}
+
+# Поля, от которых зависит, на каких страницах виден объект: его адрес и родители
+PAGE_FIELDS = {
+    **PARENT_FIELDS,
+    Project: ('slug',),
+    News: ('slug', 'project'),
+    TeamMember: ('slug',),
+}
+
+IMAGE_FIELDS = {
+    TeamMember: 'photo',
+    News: 'image',
+    ProjectResultImage: 'image',
+}
+
+
+def remember_previous(sender, instance, raw=False, **kwargs):
+    # Значения PAGE_FIELDS из базы до сохранения: после него уже не узнать, откуда объект ушёл
+    instance._previous = None
+    if instance.pk is not None and not raw:
+        instance._previous = sender._default_manager.filter(pk=instance.pk).only(*PAGE_FIELDS[sender]).first()
+
+
+def moved(sender, instance):
+    """Сменился ли у сохраняемого объекта адрес или родитель (по remember_previous)."""
+    previous = getattr(instance, '_previous', None)
+    if previous is None:
+        return False
+    attnames = [sender._meta.get_field(name).attname for name in PAGE_FIELDS[sender]]
+    return any(getattr(previous, attname) != getattr(instance, attname) for attname in attnames)
+
+
+for model in PAGE_FIELDS:
+    pre_save.connect(remember_previous, sender=model, dispatch_uid=f'remember_previous_{model.__name__}')
+
 
 @receiver(post_save, sender=Project)
 def populate_default_features(sender, instance, created, **kwargs):
-    if created:
-        if not instance.features.exists():
-            for i, data in enumerate(DEFAULT_FEATURES):
-                ProjectFeature.objects.create(
-                    project=instance,
-                    icon_class=data["icon_class"],
-                    text_ru=data["text_ru"],
-                    text_kk=data["text_kk"],
-                    text_en=data["text_en"],
-                    order=i
-                )
\ No newline at end of file
+    if created and not instance.features.exists():
+        # Один INSERT; bulk_create не шлёт post_save, поэтому версия кэша особенностей сбрасывается здесь
+        ProjectFeature.objects.bulk_create([
+            ProjectFeature(project=instance, icon_class=data["icon_class"], text_ru=data["text_ru"],
+                           text_kk=data["text_kk"], text_en=data["text_en"], order=i)
+            for i, data in enumerate(DEFAULT_FEATURES)
+        ])
+        content_changed(ProjectFeature)
+
+
+def invalidate_page_cache(sender, **kwargs):
+    # Сбрасываем кэш только после коммита (и после публикации снимка), иначе другой воркер успеет
+    # закэшировать старые данные
+    content_changed(sender)
+
+
+for model in CONTENT_MODELS:
+    post_save.connect(invalidate_page_cache, sender=model, dispatch_uid=f'page_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_page_cache, sender=model, dispatch_uid=f'page_cache_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=Project.team.through)
+def invalidate_project_team_cache(sender, action, **kwargs):
+    if action.startswith('post_'):
+        content_changed(Project, TeamMember)
+
+
+def touch_parents(sender, instance, **kwargs):
+    # Прежний родитель (remember_previous) тоже меняется: объекта на его странице больше нет
+    now = timezone.now()
+    previous = getattr(instance, '_previous', None)
+    for name in PARENT_FIELDS[sender]:
+        field = sender._meta.get_field(name)
+        parent_ids = {getattr(instance, field.attname), getattr(previous, field.attname, None)} - {None}
+        if parent_ids:
+            field.related_model.objects.filter(pk__in=parent_ids).update(updated_at=now)
+
+
+for model in PARENT_FIELDS:
+    post_save.connect(touch_parents, sender=model, dispatch_uid=f'touch_parents_save_{model.__name__}')
+    post_delete.connect(touch_parents, sender=model, dispatch_uid=f'touch_parents_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=Project.team.through)
+def touch_project_team(sender, instance, action, reverse, model, pk_set, **kwargs):
+    # pre_clear: после очистки уже не узнать, с кем была связь
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    now = timezone.now()
+    if action == 'pre_clear':
+        pk_set = set((instance.projects if reverse else instance.team).values_list('pk', flat=True))
+    type(instance).objects.filter(pk=instance.pk).update(updated_at=now)
+    model.objects.filter(pk__in=pk_set).update(updated_at=now)
+
+
+def build_image_derivatives(sender, instance, **kwargs):
+    generate_derivatives(getattr(instance, IMAGE_FIELDS[sender]).name)
+
+
+for model in IMAGE_FIELDS:
+    post_save.connect(build_image_derivatives, sender=model, dispatch_uid=f'image_derivatives_{model.__name__}')
+
+
+def update_search_index(sender, instance, **kwargs):
+    index_object(instance)
+    if sender is TeamMember:
+        # Публикации ведут на страницу сотрудника: при смене slug их адреса в индексе тоже меняются
+        for publication in instance.publications.all():
+            index_object(publication)
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_object(instance)
+
+
+for model in KIND_BY_MODEL:
+    post_save.connect(update_search_index, sender=model, dispatch_uid=f'search_index_save_{model.__name__}')
+    post_delete.connect(remove_from_search_index, sender=model, dispatch_uid=f'search_index_delete_{model.__name__}')
+
+
+# Пререндер (PRERENDER_ON_SAVE) подключается последним: его колбэк on_commit должен выполниться
+# после публикации снимка и сброса версий контента
+def prerender_saved(sender, instance, **kwargs):
+    if settings.PRERENDER_ON_SAVE:
+        prerender_changed(instance)
+
+
+def prerender_deleting(sender, instance, **kwargs):
+    if settings.PRERENDER_ON_SAVE:
+        collect_affected(instance)
+
+
+def prerender_moving(sender, instance, **kwargs):
+    # Страницы прежнего родителя и прежний адрес (он отдаст 404, и его файл удалится)
+    if settings.PRERENDER_ON_SAVE and moved(sender, instance):
+        collect_affected(instance._previous)
+
+
+for model in PAGE_FIELDS:
+    pre_save.connect(prerender_moving, sender=model, dispatch_uid=f'prerender_pre_save_{model.__name__}')
+
+for model in CONTENT_MODELS:
+    post_save.connect(prerender_saved, sender=model, dispatch_uid=f'prerender_save_{model.__name__}')
+    pre_delete.connect(prerender_deleting, sender=model, dispatch_uid=f'prerender_pre_delete_{model.__name__}')
+    post_delete.connect(prerender_saved, sender=model, dispatch_uid=f'prerender_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=Project.team.through)
+def prerender_project_team(sender, instance, action, model, pk_set, **kwargs):
+    if not settings.PRERENDER_ON_SAVE:
+        return
+    if action == 'pre_clear':
+        collect_affected(instance)
+    elif action.startswith('post_'):
+        prerender_changed(instance, model.objects.filter(pk__in=pk_set or ()))
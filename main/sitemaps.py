@@ -0,0 +1,180 @@
+import hashlib
+import itertools
+import math
+from datetime import timezone as dt_timezone
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from .cache import content_version
+from .models import News, Project, Service, TeamMember
+from .signals import CONTENT_MODELS
+from .snapshot import read_from_snapshot
+
+# Объектов в одной дочерней карте: с тремя языками это до 30 000 <url> из допустимых протоколом 50 000
+SITEMAP_LIMIT = 10000
+# <url> в одном куске потокового ответа
+CHUNK_SIZE = 200
+CONTENT_TYPE = 'application/xml; charset=utf-8'
+LANGUAGE_CODES = [code for code, _name in settings.LANGUAGES]
+
+URLSET_START = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+                'xmlns:xhtml="http://www.w3.org/1999/xhtml">\n')
+URLSET_END = '</urlset>\n'
+
+# Раздел -> (выборка, маршрут страницы объекта). Раздел pages — страницы без объектов
+SECTIONS = {
+    'projects': (lambda: Project.objects.all(), 'project_detail'),
+    'news': (lambda: News.objects.all(), 'news_detail'),
+    'team': (lambda: TeamMember.objects.filter(is_visible=True), 'team_member_detail'),
+}
+
+
+def lastmod(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') if value else None
+
+
+def url_entry(base, path, modified):
+    """
+    <url> на каждый язык (?lang=, см. main.middleware.LanguageQueryMiddleware) со ссылками hreflang
+    на все языки и x-default — адрес без параметра, где язык выбирается по cookie и Accept-Language.
+    """
+    alternates = ''.join(
+        f'<xhtml:link rel="alternate" hreflang="{code}" href={quoteattr(f"{base}{path}?lang={code}")}/>'
+        for code in LANGUAGE_CODES
+    ) + f'<xhtml:link rel="alternate" hreflang="x-default" href={quoteattr(base + path)}/>'
+    modified = f'<lastmod>{modified}</lastmod>' if modified else ''
+    return ''.join(
+        f'<url><loc>{escape(f"{base}{path}?lang={code}")}</loc>{modified}{alternates}</url>\n'
+        for code in LANGUAGE_CODES
+    )
+
+
+def page_entries():
+    """(адрес, lastmod) страниц без объектов: lastmod — по записям, которые на них видны."""
+    def last(queryset):
+        return queryset.aggregate(last=Max('updated_at'))['last']
+
+    news, team, services = last(News.objects), last(TeamMember.objects.filter(is_visible=True)), last(Service.objects)
+    categories = dict(Project.objects.order_by().values_list('category').annotate(last=Max('updated_at')))
+    return [
+        (reverse('index'), max(filter(None, (news, team, services)), default=None)),
+        (reverse('labs'), None),
+        (reverse('news_list'), news),
+        (reverse('team_list'), team),
+        *((reverse('project_list', kwargs={'category_slug': slug}), categories.get(slug))
+          for slug, _name in Project.CATEGORY_CHOICES),
+    ]
+
+
+def section_entries(section, page):
+    """(адрес, lastmod) объектов страницы page (с 1) раздела: по SITEMAP_LIMIT в порядке pk."""
+    queryset_func, route = SECTIONS[section]
+    start = (page - 1) * SITEMAP_LIMIT
+    rows = queryset_func().order_by('pk').values_list('slug', 'updated_at')[start:start + SITEMAP_LIMIT]
+    for slug, updated_at in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield reverse(route, kwargs={'slug': slug}), updated_at
+
+
+def section_pages():
+    """[(раздел, номер страницы, lastmod)] для индекса: одна агрегатная выборка на раздел."""
+    pages = [('pages', 1, None)]
+    for section, (queryset_func, _route) in SECTIONS.items():
+        stats = queryset_func().order_by().aggregate(count=Count('pk'), last=Max('updated_at'))
+        pages += [(section, page, stats['last']) for page in range(1, math.ceil(stats['count'] / SITEMAP_LIMIT) + 1)]
+    return pages
+
+
+def render_index(base):
+    # Запросы — до первого куска: он читается ещё внутри представления, пока действует read_from_snapshot
+    pages = section_pages()
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+    for section, page, modified in pages:
+        location = base + reverse('sitemap_section', kwargs={'section': section, 'page': page})
+        modified = f'<lastmod>{lastmod(modified)}</lastmod>' if modified else ''
+        yield f'<sitemap><loc>{escape(location)}</loc>{modified}</sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def render_urlset(base, entries):
+    yield URLSET_START
+    chunk = []
+    for path, modified in entries:
+        chunk.append(url_entry(base, path, lastmod(modified)))
+        if len(chunk) >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk) + URLSET_END
+
+
+def render_pages(base):
+    return render_urlset(base, page_entries())
+
+
+def render_section(section, page):
+    def render(base):
+        # Первая строка выбирается до первого куска (см. render_index); пустая страница раздела — 404
+        entries = section_entries(section, page)
+        first = next(entries, None)
+        if first is None:
+            raise Http404
+        yield from render_urlset(base, itertools.chain([first], entries))
+
+    return render
+
+
+def _caching(chunks, key):
+    # Ответ уходит по частям; в кэш попадает только полностью отданный документ
+    parts = []
+    for chunk in chunks:
+        data = chunk.encode()
+        parts.append(data)
+        yield data
+    cache.set(key, b''.join(parts), settings.PAGE_CACHE_TIMEOUT)
+
+
+def sitemap_response(request, name, render):
+    """
+    Кэш и ETag по адресу сайта и версиям контента (main/cache.py): документ строится заново только
+    после изменения контента, а до этого отдаётся из кэша или 304 без запросов к выборкам.
+    """
+    base = request.build_absolute_uri('/').rstrip('/')
+    version = content_version(*CONTENT_MODELS)
+    digest = hashlib.md5(f"{name}:{base}:{version}".encode()).hexdigest()
+    etag = f'"{digest}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content = cache.get(f"sitemap:{digest}")
+        if content is not None:
+            response = HttpResponse(content, content_type=CONTENT_TYPE)
+        else:
+            chunks = _caching(render(base), f"sitemap:{digest}")
+            first = next(chunks)
+            response = StreamingHttpResponse(itertools.chain([first], chunks), content_type=CONTENT_TYPE)
+    response.headers.setdefault('ETag', etag)
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+@require_safe
+@read_from_snapshot
+def sitemap_index(request):
+    return sitemap_response(request, 'index', render_index)
+
+
+@require_safe
+@read_from_snapshot
+def sitemap_section(request, section, page):
+    if section == 'pages' and page == 1:
+        return sitemap_response(request, 'pages', render_pages)
+    if section not in SECTIONS or page < 1:
+        raise Http404
+    return sitemap_response(request, f"{section}:{page}", render_section(section, page))
@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .cache import bump_content_version
+
+SNAPSHOT_DATABASE = 'snapshot'
+
+# Включается для GET/HEAD публичных страниц (read_from_snapshot); вне их все запросы идут в основную базу
+reading_snapshot = ContextVar('reading_snapshot', default=False)
+
+_pending = threading.local()
+
+
+def snapshot_enabled():
+    return SNAPSHOT_DATABASE in settings.DATABASES
+
+
+class SnapshotRouter:
+    """
+    Чтение контента (модели main) на публичных страницах — из опубликованного снимка базы (режим immutable:
+    без блокировок и проверки изменений файла), запись и всё остальное, в том числе сессии и пользователи, —
+    в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'main' and reading_snapshot.get() and snapshot_enabled():
+            return SNAPSHOT_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Явно: объект, прочитанный из снимка, сохраняется в основную базу
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Снимок — копия основной базы вместе со схемой
+        return False if db == SNAPSHOT_DATABASE else None
+
+
+def read_from_snapshot(view):
+    """Запросы GET/HEAD представления читают из снимка. Ставится поверх conditional_page."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            token = reading_snapshot.set(request.method in ('GET', 'HEAD'))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                reading_snapshot.reset(token)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = reading_snapshot.set(request.method in ('GET', 'HEAD'))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            reading_snapshot.reset(token)
+
+    return wrapper
+
+
+def publish_snapshot(models=()):
+    """
+    Копирует основную базу в settings.SNAPSHOT_PATH через backup API и подменяет файл атомарно
+    (os.replace): открытые соединения дочитывают старый снимок, новые открывают новый.
+    Версии контента models сбрасываются только после подмены, иначе кэш страниц заполнится старыми данными.
+    """
+    target = str(settings.SNAPSHOT_PATH)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+    os.close(fd)
+    try:
+        source = connections[DEFAULT_DB_ALIAS]
+        source.ensure_connection()
+        destination = sqlite3.connect(temp_path)
+        try:
+            source.connection.backup(destination)
+            # Снимок открывается с immutable=1: журнал WAL в нём не нужен
+            destination.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            destination.close()
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if models:
+        bump_content_version(*models)
+
+
+def content_changed(*models):
+    """
+    Вызывается из сигналов при изменении контента. Без снимка — сразу сбрасывает кэш страниц;
+    со снимком и SNAPSHOT_PUBLISH_ON_SAVE — после коммита публикует снимок один раз на транзакцию.
+    Без автопубликации версии сбросит manage.py publish_snapshot.
+    """
+    if not snapshot_enabled():
+        transaction.on_commit(lambda: bump_content_version(*models))
+    elif settings.SNAPSHOT_PUBLISH_ON_SAVE:
+        pending = getattr(_pending, 'models', None)
+        if pending is None:
+            pending = _pending.models = set()
+        pending.update(models)
+        transaction.on_commit(_publish_pending)
+
+
+def _publish_pending():
+    # Сохранение в админке с inline вызывает десятки сигналов: первый колбэк публикует всё, остальные — пустые
+    models = tuple(_pending.models)
+    _pending.models.clear()
+    if models:
+        publish_snapshot(models)
@@ -0,0 +1,245 @@
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+from collections import defaultdict
+from functools import lru_cache
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Текстовые форматы; картинки, woff2 и архивы уже сжаты
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.md', '.html', '.xml', '.ico', '.ttf', '.otf', '.eot',
+}
+# Меньше этого сжатие не окупает заголовки и лишнее обращение к диску
+MIN_COMPRESS_SIZE = 256
+# Кодировки в порядке предпочтения: (Content-Encoding, суффикс копии)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def compress(data):
+    """{суффикс: сжатые данные}; .br — только если установлен brotli."""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Имена с хешем содержимого (css/style.<hash>.css) и сжатые копии текстовых файлов рядом
+    с оригиналом: .gz всегда, .br — если установлен brotli. Копии отдаёт nginx (gzip_static)
+    или serve_static. Сжимаются и файлы без хеша: CKEditor подгружает свои скрипты по исходным именам.
+    """
+
+    def stored_name(self, name):
+        # Имени нет в манифесте (collectstatic ещё не запускался) — ссылка без хеша, как при DEBUG,
+        # вместо ValueError на каждой странице. serve_static отдаёт такие файлы без immutable
+        path = urlsplit(unquote(name)).path.strip()
+        if self.hashed_files.get(self.hash_key(self.clean_name(path))) is None:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(paths) | set(self.hashed_files.values())):
+            self.compress_file(name)
+
+    def compress_file(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        path = self.path(name)
+        stat = os.stat(path)
+        if stat.st_size < MIN_COMPRESS_SIZE:
+            return
+        # Копия с тем же mtime уже сделана из этого файла при прошлом запуске
+        suffixes = ['.gz', '.br'] if brotli is not None else ['.gz']
+        if all(os.path.exists(path + suffix) and os.stat(path + suffix).st_mtime_ns == stat.st_mtime_ns
+               for suffix in suffixes):
+            return
+        with open(path, 'rb') as source:
+            data = source.read()
+        for suffix, compressed in compress(data).items():
+            if len(compressed) >= len(data):
+                continue
+            with open(path + suffix, 'wb') as output:
+                output.write(compressed)
+            os.utime(path + suffix, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def compression_report(storage=staticfiles_storage):
+    """
+    {расширение: {'files', 'original', 'gzip', 'br', 'saved'}} по файлам STATIC_ROOT, на которые
+    ссылаются страницы (имена с хешем из манифеста; без манифеста — все файлы).
+    saved — разница между исходным размером и наименьшей сжатой копией.
+    """
+    # {имя с хешем: исходное имя}: тип берётся из исходного имени (у LICENSE.<hash> расширения нет)
+    names = {hashed: name for name, hashed in getattr(storage, 'hashed_files', {}).items()}
+    if not names:
+        for root, _dirs, files in os.walk(storage.location):
+            for filename in files:
+                if not filename.endswith(('.gz', '.br')):
+                    name = os.path.relpath(os.path.join(root, filename), storage.location)
+                    names[name] = name
+    report = defaultdict(lambda: {'files': 0, 'original': 0, 'gzip': 0, 'br': 0, 'saved': 0})
+    for name, original_name in names.items():
+        path = storage.path(name)
+        if not os.path.isfile(path):
+            continue
+        size = os.path.getsize(path)
+        row = report[os.path.splitext(original_name)[1].lower() or '-']
+        row['files'] += 1
+        row['original'] += size
+        smallest = size
+        for coding, suffix in ENCODINGS:
+            compressed = os.path.getsize(path + suffix) if os.path.isfile(path + suffix) else size
+            row[coding] += compressed
+            smallest = min(smallest, compressed)
+        row['saved'] += size - smallest
+    return dict(report)
+
+
+@lru_cache(maxsize=1)
+def immutable_names():
+    # Манифест читается при создании storage, после collectstatic воркеры всё равно перезапускаются
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с q > 0 (с учётом "*")."""
+    weights = {}
+    for part in header.split(','):
+        coding, *params = part.strip().split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            weights[coding.strip().lower()] = quality
+    return {coding for coding, _suffix in ENCODINGS if weights.get(coding, weights.get('*', 0)) > 0}
+
+
+def parse_range(header, size):
+    """
+    (start, end) включительно для "bytes=a-b", "bytes=a-" и "bytes=-n". None — заголовок
+    не поддерживается (несколько диапазонов, ошибка синтаксиса): отдаётся весь файл.
+    ValueError — диапазон за пределами файла (416).
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        if int(last) == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_static(request, path):
+    """
+    Раздача STATIC_ROOT без настроенного nginx (SERVE_STATIC): сжатая копия .br/.gz по
+    Accept-Encoding, Range-запросы (по несжатому файлу), ETag/Last-Modified и
+    Cache-Control immutable для имён с хешем из манифеста.
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    range_header = request.headers.get('Range')
+    compressed = [(coding, suffix) for coding, suffix in ENCODINGS if os.path.isfile(full_path + suffix)]
+    served_path, coding = full_path, None
+    if not range_header:
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        for candidate, suffix in compressed:
+            if candidate in accepted:
+                served_path, coding = full_path + suffix, candidate
+                break
+
+    stat = os.stat(served_path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + coding if coding else ""}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if name in immutable_names() else 'no-cache',
+    }
+    if compressed:
+        headers['Vary'] = 'Accept-Encoding'
+    if coding:
+        headers['Content-Encoding'] = coding
+    else:
+        headers['Accept-Ranges'] = 'bytes'
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = file_response(request, full_path, served_path, stat.st_size, etag, range_header)
+    for header, value in headers.items():
+        response.headers.setdefault(header, value)
+    return response
+
+
+def file_response(request, full_path, served_path, size, etag, range_header):
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    byte_range = None
+    # If-Range с другим ETag: файл изменился, докачка невозможна — отдаётся целиком
+    if range_header and request.headers.get('If-Range', etag) == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+    if byte_range is None:
+        return FileResponse(open(served_path, 'rb'), content_type=content_type,
+                            filename=os.path.basename(full_path))
+    start, end = byte_range
+    response = StreamingHttpResponse(read_range(served_path, start, end - start + 1), status=206,
+                                     content_type=content_type)
+    response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.headers['Content-Length'] = str(end - start + 1)
+    return response
@@ -0,0 +1,17 @@
+from django import template
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from main.assets import read_manifest, tailwind_css_path
+
+register = template.Library()
+
+
+@register.simple_tag
+def tailwind_stylesheet():
+    path = read_manifest() if settings.DEBUG else tailwind_css_path()
+    if path is None:
+        return render_to_string('main/includes/tailwind_cdn.html')
+    return format_html('<link rel="stylesheet" href="{}">', static(path))
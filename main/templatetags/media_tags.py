@@ -0,0 +1,62 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from main.images import DERIVATIVE_WIDTHS, closest_derivative, derivative_name, derivative_widths, has_derivatives
+from main.rich_text import image_info
+
+register = template.Library()
+
+
+def _name(image):
+    return getattr(image, 'name', image) or ''
+
+
+def _original_width(name):
+    # Ширина оригинала с учётом поворота из EXIF (как у копий); читается только заголовок файла
+    info = image_info(name)
+    return info[0] if info else DERIVATIVE_WIDTHS[-1]
+
+
+def _srcset(name, ext, original_width):
+    # Как в main/rich_text.py: копия в размере оригинала идёт с настоящей шириной
+    return ', '.join(
+        f"{default_storage.url(derivative_name(name, width, ext))} {actual}w"
+        for width, actual in derivative_widths(original_width)
+    )
+
+
+@register.filter
+def derivative_url(image, width):
+    name = _name(image)
+    if not name:
+        return ''
+    if not has_derivatives(name):
+        return default_storage.url(name)
+    return default_storage.url(derivative_name(name, closest_derivative(int(width), _original_width(name))))
+
+
+@register.filter
+def srcset(image, ext='webp'):
+    name = _name(image)
+    if not name or not has_derivatives(name):
+        return ''
+    return _srcset(name, ext, _original_width(name))
+
+
+@register.inclusion_tag('main/includes/picture.html')
+def responsive_image(image, sizes='100vw', alt='', css_class='', lazy=True):
+    name = _name(image)
+    context = {'src': '', 'sizes': sizes, 'alt': alt, 'css_class': css_class, 'lazy': lazy}
+    if not name:
+        return context
+    if has_derivatives(name):
+        original_width = _original_width(name)
+        middle_width = closest_derivative(DERIVATIVE_WIDTHS[len(DERIVATIVE_WIDTHS) // 2], original_width)
+        context.update(
+            src=default_storage.url(derivative_name(name, middle_width, 'jpg')),
+            webp_srcset=_srcset(name, 'webp', original_width),
+            jpg_srcset=_srcset(name, 'jpg', original_width),
+        )
+    else:
+        context['src'] = default_storage.url(name)
+    return context
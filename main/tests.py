@@ -1,3 +1,231 @@
-from django.test import TestCase
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
 
-# Create your tests here.
+import telegram
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import ContactMessage, News, Project, Publication, Service, SocialLink, TeamMember
+from .outbox import OutboxDispatcher
+
+# Страниц админки при росте данных: число запросов не должно зависеть от количества строк
+MEMBERS = 30
+PROJECTS = 30
+NEWS = 60
+PUBLICATIONS = 120
+
+
+@override_settings(PRERENDER_ON_SAVE=False)
+class AdminQueryBudgetTests(TestCase):
+    """
+    Верхние границы числа запросов для списков и форм админки. Границы не зависят от объёма данных:
+    лишний запрос на строку списка или на форму во вложенном наборе сразу выводит страницу за бюджет.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        members = TeamMember.objects.bulk_create(
+            TeamMember(name_ru=f"Сотрудник {i}", position_ru="Исследователь", slug=f"member-{i}")
+            for i in range(MEMBERS)
+        )
+        cls.member = members[0]
+        SocialLink.objects.bulk_create(
+            SocialLink(member=cls.member, icon_class='fab fa-github', url=f"https://example.com/{i}") for i in range(3)
+        )
+        projects = [
+            Project.objects.create(category='research', title_ru=f"Проект {i}", slug=f"project-{i}")
+            for i in range(PROJECTS)
+        ]
+        cls.project = projects[0]
+        cls.project.team.set(members[:10])
+        News.objects.bulk_create(
+            News(title_ru=f"Новость {i}", slug=f"news-{i}", image='news_images/news.jpg', content_ru="<p>Текст</p>",
+                 published_date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i),
+                 project=projects[i % PROJECTS])
+            for i in range(NEWS)
+        )
+        cls.news = News.objects.first()
+        Publication.objects.bulk_create(
+            Publication(member=cls.member, title_ru=f"Статья {i}", source="Журнал", description_ru="<p>Текст</p>",
+                        publication_date=datetime.date(2020, 1, 1) + datetime.timedelta(days=i),
+                        project=projects[i % PROJECTS])
+            for i in range(PUBLICATIONS)
+        )
+        cls.service = Service.objects.create(title_ru="Услуга", description_ru="Описание", icon_class='fas fa-cog')
+        cls.message = ContactMessage.objects.create(name="Иван", email='ivan@example.com', message="Здравствуйте")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertPageWithinBudget(self, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{url}: {len(queries)} запросов при бюджете {budget}\n" + '\n'.join(q['sql'] for q in queries),
+        )
+        return response
+
+    def test_changelists(self):
+        for model, budget in (
+            (TeamMember, 6), (Project, 6), (News, 6), (Service, 6), (ContactMessage, 6),
+        ):
+            with self.subTest(model=model.__name__):
+                self.assertPageWithinBudget(reverse(f'admin:main_{model._meta.model_name}_changelist'), budget)
+
+    def test_news_changelist_filtered_by_project(self):
+        url = reverse('admin:main_news_changelist')
+        response = self.assertPageWithinBudget(f"{url}?project__id__exact={self.project.pk}", 7)
+        self.assertContains(response, self.project.title_ru)
+
+    def test_change_forms(self):
+        for obj, budget in (
+            (self.member, 8), (self.project, 9), (self.news, 5), (self.service, 4), (self.message, 5),
+        ):
+            with self.subTest(model=type(obj).__name__):
+                self.assertPageWithinBudget(reverse(f'admin:main_{obj._meta.model_name}_change', args=[obj.pk]), budget)
+
+    def test_add_forms(self):
+        for model in (TeamMember, Project, News, Service):
+            with self.subTest(model=model.__name__):
+                self.assertPageWithinBudget(reverse(f'admin:main_{model._meta.model_name}_add'), 4)
+
+    def test_publications_inline_is_paginated(self):
+        url = reverse('admin:main_teammember_change', args=[self.member.pk])
+        response = self.assertPageWithinBudget(f"{url}?publications-page=3", 8)
+        formset = next(
+            inline.formset for inline in response.context['inline_admin_formsets']
+            if inline.formset.model is Publication
+        )
+        self.assertEqual(formset.page.number, 3)
+        self.assertEqual(formset.page.paginator.count, PUBLICATIONS)
+        self.assertEqual(formset.initial_form_count(), formset.per_page)
+
+
+class StubTelegramHandler(BaseHTTPRequestHandler):
+    # Заглушка Bot API: ответ sendMessage выбирается по имени отправителя в тексте заявки (латиницей:
+    # кириллица в теле запроса экранирована)
+    responses = {
+        'Reject': (400, {'ok': False, 'error_code': 400, 'description': "Bad Request: chat not found"}),
+        'Wait': (429, {'ok': False, 'error_code': 429, 'description': "Too Many Requests: retry after 7",
+                            'parameters': {'retry_after': 7}}),
+        'Fail': (502, {'ok': False, 'error_code': 502, 'description': "Bad Gateway"}),
+    }
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        self.server.requests.append((self.path.rsplit('/', 1)[-1], body))
+        status, payload = 200, {'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': "Stub", 'username': 'stub_bot'}}
+        if self.path.endswith('/sendMessage'):
+            payload['result'] = {'message_id': 1, 'date': 0, 'chat': {'id': 1, 'type': 'private'}, 'text': ''}
+            status, payload = next(
+                (response for name, response in self.responses.items() if name in body), (status, payload)
+            )
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class OutboxDispatcherTests(TestCase):
+    """OutboxDispatcher с настоящим клиентом python-telegram-bot и локальной заглушкой Bot API (как --api-url)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(('127.0.0.1', 0), StubTelegramHandler)
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        self.server.requests.clear()
+
+    def dispatch(self, max_attempts=3):
+        async def run():
+            bot = telegram.Bot('123:TEST', base_url=f"http://127.0.0.1:{self.server.server_port}/bot")
+            async with bot:
+                await OutboxDispatcher(bot, '1', max_attempts=max_attempts).run(once=True)
+
+        async_to_sync(run)()
+
+    def message(self, name, **kwargs):
+        return ContactMessage.objects.create(name=name, phone='+77000000000', email='a@example.com',
+                                             message="Здравствуйте", **kwargs)
+
+    def sent_messages(self):
+        return [body for method, body in self.server.requests if method == 'sendMessage']
+
+    def test_sent(self):
+        message = self.message("Иван")
+        self.dispatch()
+        message.refresh_from_db()
+        self.assertEqual(message.status, ContactMessage.STATUS_SENT)
+        self.assertEqual(message.attempts, 1)
+        self.assertIsNotNone(message.sent_at)
+        self.assertEqual(len(self.sent_messages()), 1)
+        # Отправленная заявка больше не уходит
+        self.dispatch()
+        self.assertEqual(len(self.sent_messages()), 1)
+
+    def test_retry_after(self):
+        message = self.message("Wait")
+        before = timezone.now()
+        self.dispatch()
+        message.refresh_from_db()
+        self.assertEqual(message.status, ContactMessage.STATUS_PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreaterEqual(message.next_attempt_at, before + datetime.timedelta(seconds=7))
+        self.assertIn('RetryAfter', message.last_error)
+        # До next_attempt_at заявка не отправляется повторно
+        self.dispatch()
+        self.assertEqual(len(self.sent_messages()), 1)
+
+    def test_bad_request_is_dead(self):
+        message = self.message("Reject")
+        self.dispatch()
+        message.refresh_from_db()
+        self.assertEqual(message.status, ContactMessage.STATUS_DEAD)
+        self.assertIn('BadRequest', message.last_error)
+
+    def test_max_attempts_is_dead(self):
+        message = self.message("Fail", attempts=2)
+        self.dispatch(max_attempts=3)
+        message.refresh_from_db()
+        self.assertEqual(message.status, ContactMessage.STATUS_DEAD)
+        self.assertEqual(message.attempts, 3)
+
+    def test_locked_result_save_is_retried(self):
+        # Telegram принял сообщение, а база занята: результат записывается повтором, без второй отправки
+        message = self.message("Иван")
+        save = ContactMessage.asave
+        calls = []
+
+        async def flaky_save(instance, *args, **kwargs):
+            calls.append(kwargs.get('update_fields'))
+            if len(calls) == 2:
+                raise OperationalError("database is locked")
+            return await save(instance, *args, **kwargs)
+
+        with mock.patch.object(ContactMessage, 'asave', flaky_save), mock.patch('main.outbox.SAVE_RETRY_DELAY', 0):
+            self.dispatch()
+        message.refresh_from_db()
+        self.assertEqual(message.status, ContactMessage.STATUS_SENT)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(self.sent_messages()), 1)
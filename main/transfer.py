@@ -0,0 +1,378 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections import Counter
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, FileField, ImageField, Prefetch
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from .images import generate_derivatives
+from .models import (
+    News, Project, ProjectFeature, ProjectResultImage, ProjectTechStack, Publication, Service, SocialLink,
+    TeamMember,
+)
+from .prerender import page_urls, prune, render_pages
+from .rich_text import media_name
+from .search import rebuild_index
+from .signals import CONTENT_MODELS
+from .snapshot import content_changed
+
+CONTENT_FILE = 'content.jsonl'
+MEDIA_DIR = 'media'
+BATCH_SIZE = 500
+HASH_CHUNK_SIZE = 64 * 1024
+# Ссылки на загруженные через CKEditor файлы внутри rich-text полей
+MEDIA_LINK_RE = re.compile(r'''\b(?:src|href)=["']([^"']+)["']''')
+
+# Вид записи -> модель; записи в файле идут в этом порядке, чтобы ссылки на slug уже были в базе
+MODELS = {
+    'member': TeamMember,
+    'project': Project,
+    'news': News,
+    'publication': Publication,
+    'service': Service,
+}
+# Inline-записи, которые хранятся внутри строки родителя и при импорте заменяются целиком
+CHILDREN = {
+    TeamMember: (('social_links', SocialLink, 'member'),),
+    Project: (('features', ProjectFeature, 'project'), ('tech_stack', ProjectTechStack, 'project'),
+              ('result_images', ProjectResultImage, 'project')),
+}
+# Внешние ключи, которые переносятся как slug связанной записи
+REFERENCES = {
+    News: (('project', Project),),
+    Publication: (('member', TeamMember), ('project', Project)),
+}
+
+
+def data_fields(model):
+    # Редактируемые поля без ключей и связей; excerpt_* и *_html_* пересчитываются при импорте
+    return [field for field in model._meta.concrete_fields
+            if field.editable and not field.primary_key and not field.is_relation]
+
+
+def derived_fields(model):
+    return [field.attname for field in model._meta.concrete_fields if not field.editable and field.name != 'updated_at']
+
+
+def natural_key(model, values):
+    """Ключ, по которому запись из архива сопоставляется с записью в базе."""
+    if model is Publication:
+        return values['member'], values['title_ru'], str(values['publication_date'])
+    if model is Service:
+        return values['title_ru']
+    return values['slug']
+
+
+def file_hash(storage, name):
+    digest = hashlib.sha256()
+    with storage.open(name) as source:
+        for chunk in source.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def rich_text_names(model):
+    prefixes = getattr(model, 'rich_text_fields', ())
+    return [f"{prefix}_{code}" for prefix in prefixes for code, _name in settings.LANGUAGES]
+
+
+class MediaExport:
+    """Копирует файлы из default_storage в <архив>/media/<sha256><расширение>: одинаковые файлы хранятся один раз."""
+
+    def __init__(self, root):
+        self.root = os.path.join(root, MEDIA_DIR)
+        os.makedirs(self.root, exist_ok=True)
+        self.hashes = {}
+
+    def add(self, name):
+        if name not in self.hashes:
+            self.hashes[name] = self._copy(name) if name and default_storage.exists(name) else None
+        return self.hashes[name]
+
+    def _copy(self, name):
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as output, default_storage.open(name) as source:
+            for chunk in source.chunks(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+                output.write(chunk)
+        sha256 = digest.hexdigest()
+        target = os.path.join(self.root, archive_name(name, sha256))
+        if os.path.exists(target):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, target)
+        return sha256
+
+
+def archive_name(name, sha256):
+    return sha256 + os.path.splitext(name)[1].lower()
+
+
+class MediaImport:
+    """
+    Возвращает файлы из архива в default_storage под прежними именами. Файл с тем же именем
+    и тем же содержимым не перезаписывается, с другим — сохраняется как <имя>_<начало sha256>
+    (повторный импорт находит его там же).
+    """
+
+    def __init__(self, root):
+        self.root = os.path.join(root, MEDIA_DIR)
+        self.restored = {}
+
+    def restore(self, name, sha256):
+        key = (name, sha256)
+        if key not in self.restored:
+            self.restored[key] = self._restore(name, sha256)
+        return self.restored[key]
+
+    def _restore(self, name, sha256):
+        stem, ext = os.path.splitext(name)
+        candidates = (name, f"{stem}_{sha256[:12]}{ext}")
+        for candidate in candidates:
+            if default_storage.exists(candidate) and file_hash(default_storage, candidate) == sha256:
+                return candidate
+        path = os.path.join(self.root, archive_name(name, sha256))
+        if not os.path.isfile(path):
+            raise ValueError(f"В архиве нет файла {name} ({sha256})")
+        target = next((candidate for candidate in candidates if not default_storage.exists(candidate)), name)
+        with open(path, 'rb') as source:
+            return default_storage.save(target, File(source))
+
+
+# Экспорт
+
+def _values(obj):
+    values = {}
+    for field in data_fields(type(obj)):
+        value = field.value_from_object(obj)
+        values[field.name] = value.name if isinstance(value, FieldFile) else value
+    return values
+
+
+def _media(model, values, media):
+    # {имя файла: sha256} для файловых полей и ссылок на MEDIA_URL в rich-text полях
+    names = {values[field.name] for field in data_fields(model) if isinstance(field, FileField)}
+    for field_name in rich_text_names(model):
+        names.update(media_name(src) for src in MEDIA_LINK_RE.findall(values[field_name]))
+    hashes = {name: media.add(name) for name in sorted(names - {None, ''})}
+    return {name: sha256 for name, sha256 in hashes.items() if sha256}
+
+
+def _record(kind, obj, media):
+    model = type(obj)
+    values = _values(obj)
+    record = {'type': kind, 'fields': values}
+    for name, _related_model in REFERENCES.get(model, ()):
+        record[name] = getattr(obj, f'{name}_slug')
+    if model is Project:
+        record['team'] = [member.slug for member in obj.team.all()]
+    files = _media(model, values, media)
+    for name, _child_model, _parent in CHILDREN.get(model, ()):
+        children = record[name] = []
+        for child in getattr(obj, name).all():
+            child_values = _values(child)
+            files.update(_media(type(child), child_values, media))
+            children.append(child_values)
+    record['media'] = files
+    return record
+
+
+def export_queryset(model):
+    queryset = model.objects.defer(*derived_fields(model)).order_by('pk')
+    if model is Project:
+        queryset = queryset.prefetch_related(
+            'features', 'tech_stack', 'result_images', Prefetch('team', queryset=TeamMember.objects.only('slug')),
+        )
+    elif model is TeamMember:
+        queryset = queryset.prefetch_related('social_links')
+    elif model in REFERENCES:
+        # Из связанных записей нужен только slug: JOIN без их rich-text колонок
+        queryset = queryset.annotate(**{f'{name}_slug': F(f'{name}__slug') for name, _related in REFERENCES[model]})
+    return queryset
+
+
+def export_content(root, batch_size=BATCH_SIZE):
+    """
+    Пишет <root>/content.jsonl — по строке на запись с inline-записями внутри — и файлы в <root>/media.
+    Записи читаются итератором по batch_size, поэтому память не растёт с размером базы.
+    Возвращает {вид записи: число}.
+    """
+    os.makedirs(root, exist_ok=True)
+    media = MediaExport(root)
+    counts = Counter()
+    with open(os.path.join(root, CONTENT_FILE), 'w', encoding='utf-8') as output:
+        for kind, model in MODELS.items():
+            for obj in export_queryset(model).iterator(chunk_size=batch_size):
+                record = _record(kind, obj, media)
+                output.write(json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+                counts[kind] += 1
+    return counts
+
+
+# Импорт
+
+def read_records(root):
+    with open(os.path.join(root, CONTENT_FILE), encoding='utf-8') as source:
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                raise ValueError(f"Строка {number}: {exc}")
+            if record.get('type') not in MODELS:
+                raise ValueError(f"Строка {number}: неизвестный тип записи {record.get('type')!r}")
+            yield record
+
+
+def batches(records, batch_size):
+    # Подряд идущие записи одного типа, не больше batch_size
+    batch = []
+    for record in records:
+        if batch and (record['type'] != batch[0]['type'] or len(batch) >= batch_size):
+            yield batch
+            batch = []
+        batch.append(record)
+    if batch:
+        yield batch
+
+
+def _build(model, values, files, media):
+    obj = model()
+    renamed = {}
+    for field in data_fields(model):
+        if field.name not in values:
+            continue
+        value = field.to_python(values[field.name])
+        if isinstance(field, FileField) and value:
+            restored = media.restore(value, files[value]) if value in files else value
+            if isinstance(field, ImageField):
+                generate_derivatives(restored)
+            value = restored
+        setattr(obj, field.attname, value)
+    # Файлы из rich-text полей, сохранённые под другим именем: ссылки переписываются на новое
+    for name, sha256 in files.items():
+        restored = media.restore(name, sha256)
+        if restored != name:
+            renamed[default_storage.url(name)] = default_storage.url(restored)
+    for field_name in rich_text_names(model):
+        for old, new in renamed.items():
+            setattr(obj, field_name, getattr(obj, field_name).replace(old, new))
+    return obj
+
+
+def _slug_ids(model, slugs):
+    return dict(model.objects.filter(slug__in=set(slugs) - {None}).values_list('slug', 'pk'))
+
+
+def _existing(model, keys):
+    if model is Publication:
+        members = {key[0] for key in keys}
+        rows = model.objects.filter(member__slug__in=members).values_list(
+            'member__slug', 'title_ru', 'publication_date', 'pk')
+        return {(member, title, str(date)): pk for member, title, date, pk in rows}
+    if model is Service:
+        return dict(model.objects.filter(title_ru__in=keys).values_list('title_ru', 'pk'))
+    return _slug_ids(model, keys)
+
+
+def _save(model, objects):
+    # objects: {естественный ключ: объект}; у найденных в базе проставляется pk
+    existing = _existing(model, list(objects))
+    now = timezone.now()
+    created, updated = [], []
+    for key, obj in objects.items():
+        obj.pk = existing.get(key)
+        obj.updated_at = now
+        if obj.excerpt_source:
+            obj.update_excerpts()
+        obj.update_rich_text()
+        (updated if obj.pk else created).append(obj)
+    model.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    fields = [field.attname for field in model._meta.concrete_fields if not field.primary_key]
+    model.objects.bulk_update(updated, fields, batch_size=BATCH_SIZE)
+    return len(created), len(updated)
+
+
+def _replace_children(model, parents, records, media):
+    for name, child_model, parent_field in CHILDREN.get(model, ()):
+        child_model.objects.filter(**{f'{parent_field}__in': parents.values()}).delete()
+        children = []
+        for key, record in records.items():
+            for values in record.get(name, ()):
+                child = _build(child_model, values, record['media'], media)
+                setattr(child, f'{parent_field}_id', parents[key].pk)
+                children.append(child)
+        child_model.objects.bulk_create(children, batch_size=BATCH_SIZE)
+
+
+def _replace_team(projects, records):
+    through = Project.team.through
+    through.objects.filter(project__in=projects.values()).delete()
+    members = _slug_ids(TeamMember, [slug for record in records.values() for slug in record.get('team', ())])
+    through.objects.bulk_create([
+        through(project_id=projects[key].pk, teammember_id=members[slug])
+        for key, record in records.items() for slug in record.get('team', ()) if slug in members
+    ], batch_size=BATCH_SIZE)
+
+
+def import_batch(model, batch, media):
+    """Записывает пачку записей одного типа: upsert по ключу, inline-записи и команда проекта заменяются."""
+    references = {
+        name: _slug_ids(related_model, [record.get(name) for record in batch])
+        for name, related_model in REFERENCES.get(model, ())
+    }
+    objects, records = {}, {}
+    for record in batch:
+        obj = _build(model, record['fields'], record.get('media', {}), media)
+        for name, _related_model in REFERENCES.get(model, ()):
+            slug = record.get(name)
+            if slug is not None and slug not in references[name] and not model._meta.get_field(name).null:
+                raise ValueError(f"{model._meta.verbose_name}: нет записи {name}={slug!r}")
+            setattr(obj, f'{name}_id', references[name].get(slug))
+        key = natural_key(model, {**record['fields'], **{name: record.get(name) for name in references}})
+        # Повтор ключа в архиве: остаётся последняя запись
+        objects[key], records[key] = obj, record
+    created, updated = _save(model, objects)
+    _replace_children(model, objects, records, media)
+    if model is Project:
+        _replace_team(objects, records)
+    return created, updated
+
+
+def import_content(root, batch_size=BATCH_SIZE):
+    """
+    Загружает архив export_content: пачками по batch_size записей, каждая пачка — в своей транзакции
+    (bulk_create новых и bulk_update найденных по slug записей). Сигналы при этом не вызываются, поэтому
+    excerpt_* и *_html_* считаются здесь, а индекс поиска, кэш и снимок обновляет finish_import.
+    Возвращает {вид записи: (создано, обновлено)}.
+    """
+    media = MediaImport(root)
+    created, updated = Counter(), Counter()
+    for batch in batches(read_records(root), batch_size):
+        kind = batch[0]['type']
+        with transaction.atomic():
+            batch_created, batch_updated = import_batch(MODELS[kind], batch, media)
+        created[kind] += batch_created
+        updated[kind] += batch_updated
+    return {kind: (created[kind], updated[kind]) for kind in MODELS if kind in created or kind in updated}
+
+
+def finish_import():
+    """То, что при сохранении в админке делают сигналы: индекс поиска, версии кэша и снимок, пререндер."""
+    rebuild_index()
+    content_changed(*CONTENT_MODELS)
+    if settings.PRERENDER_ON_SAVE:
+        urls = page_urls()
+        render_pages(urls)
+        prune(urls)
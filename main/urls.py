@@ -1,18 +1,37 @@
+from django.conf import settings
 from django.urls import path
-from . import views
-from .views import send_telegram_message
+from . import views, async_views
+from .api import resource_detail, resource_list
+from .feeds import category_feed, news_feed, project_feed
+from .sitemaps import sitemap_index, sitemap_section
+from .views import csrf, metrics, send_telegram_message
+
+# Под ASGI публичные страницы обслуживаются async-версиями (см. README, раздел о развёртывании)
+public = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('labs/', views.labs, name='labs'),
+    path('', public.index, name='index'),
+    path('labs/', public.labs, name='labs'),
 
-    path('projects/<slug:category_slug>/', views.project_list, name='project_list'),
-    path('projects/details/<slug:slug>/', views.project_detail, name='project_detail'),
+    path('projects/<slug:category_slug>/', public.project_list, name='project_list'),
+    path('projects/details/<slug:slug>/', public.project_detail, name='project_detail'),
 
-    path('news/', views.news_list, name='news_list'),
-    path('news/<slug:slug>/', views.news_detail, name='news_detail'),
+    path('news/', public.news_list, name='news_list'),
+    path('news/more/cards/', public.news_list_more, name='news_list_more'),
+    path('news/<slug:slug>/', public.news_detail, name='news_detail'),
 
-    path('team/', views.team_list, name='team_list'),
-    path('team/<slug:slug>/', views.team_member_detail, name='team_member_detail'),
+    path('team/', public.team_list, name='team_list'),
+    path('team/more/cards/', public.team_list_more, name='team_list_more'),
+    path('team/<slug:slug>/', public.team_member_detail, name='team_member_detail'),
+    path('search/', public.search, name='search'),
     path('send-telegram/', send_telegram_message, name='send_telegram'),
+    path('csrf/', csrf, name='csrf'),
+    path('metrics', metrics, name='metrics'),
+    path('feeds/<str:lang>/news.<str:feed_format>', news_feed, name='news_feed'),
+    path('feeds/<str:lang>/news/<slug:category>.<str:feed_format>', category_feed, name='news_category_feed'),
+    path('feeds/<str:lang>/projects/<slug:slug>.<str:feed_format>', project_feed, name='project_news_feed'),
+    path('api/<slug:resource>/', resource_list, name='api_list'),
+    path('api/<slug:resource>/<slug:slug>/', resource_detail, name='api_detail'),
+    path('sitemap.xml', sitemap_index, name='sitemap'),
+    path('sitemap-<slug:section>-<int:page>.xml', sitemap_section, name='sitemap_section'),
 ]
\ No newline at end of file
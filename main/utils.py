@@ -0,0 +1,26 @@
+import html
+import re
+
+from django.db import OperationalError
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 40
+
+WHITESPACE_RE = re.compile(r'\s+')
+BLOCK_TAG_RE = re.compile(r'<(/?(?:p|div|br|li|ul|ol|h[1-6]|tr|td|th|blockquote|pre)\b)', re.IGNORECASE)
+
+
+def html_to_text(value):
+    # Пробел перед блочными тегами, чтобы соседние абзацы не склеивались в одно слово
+    value = BLOCK_TAG_RE.sub(r' <\1', value or '')
+    return WHITESPACE_RE.sub(' ', html.unescape(strip_tags(value))).strip()
+
+
+def make_excerpt(value, words=EXCERPT_WORDS):
+    return Truncator(html_to_text(value)).words(words)
+
+
+def is_database_locked(exc):
+    # SQLite не дождался блокировки в пределах timeout: запрос можно безопасно повторить позже
+    return isinstance(exc, OperationalError) and 'database is locked' in str(exc)
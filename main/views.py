@@ -1,100 +1,260 @@
-import asyncio
-import telegram
+from django.db.models import Prefetch
 from django.shortcuts import render, get_object_or_404
 from django.utils.translation import gettext as _
-from .models import TeamMember, Project, News, Service
-from django.http import JsonResponse
+from .models import (
+    TeamMember, Project, ProjectFeature, ProjectTechStack, ProjectResultImage,
+    News, Service, SocialLink, Publication, ContactMessage
+)
+from .cache import cache_page_per_language, conditional_page, change_stamp, ChangeStamp
+from .pagination import KeysetPaginator
+from .metrics import render_prometheus, store as metrics_store
+from .search import search as search_documents
+from .snapshot import read_from_snapshot
 from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import ensure_csrf_cookie
 
+# Всё, что шаблоны проектов читают через project.<relation>.all, загружается заранее:
+# число запросов не зависит от количества проектов на странице.
+# Сортировка prefetch начинается с project_id, чтобы выборка по project_id IN (...) шла по индексу
+# (project, order) без временного B-дерева для ORDER BY.
+PROJECT_LIST_PREFETCH = (
+    Prefetch('features', queryset=ProjectFeature.objects.order_by('project', 'order')),
+    Prefetch('tech_stack', queryset=ProjectTechStack.objects.order_by('project', 'order')),
+)
+PROJECT_BODY_FIELDS = ('full_description', 'task_description', 'result_description', 'detailed_info')
 
-def index(request):
-    team_members = TeamMember.objects.filter(is_visible=True)[:6]
-    latest_news = News.objects.all()[:3]
-    services = Service.objects.all()[:4]
-    context = {
-        'team': team_members,
-        'latest_news': latest_news,
-        'services': services,
-    }
-    return render(request, 'main/index.html', context)
+NEWS_PAGE_SIZE = 10
+NEWS_ORDERING = ('-published_date', '-id')
+TEAM_PAGE_SIZE = 24
+TEAM_ORDERING = ('id',)
+SEARCH_QUERY_MAX_LENGTH = 200
 
 
-def team_list(request):
-    all_team_members = TeamMember.objects.filter(is_visible=True)
-    context = {
-        'all_team': all_team_members
+def project_detail_prefetch():
+    return PROJECT_LIST_PREFETCH + (
+        'result_images',
+        Prefetch('team', queryset=TeamMember.objects.for_language().defer_translations('bio')),
+        Prefetch('publications', queryset=Publication.objects.for_language().defer_rich_text_sources()),
+        Prefetch('news', queryset=News.objects.for_language().defer_translations('content')),
+    )
+
+
+# Запросы публичных страниц общие для синхронных представлений и main/async_views.py
+
+def index_querysets():
+    return {
+        'team': TeamMember.objects.for_language().defer_translations('bio').filter(is_visible=True)[:6],
+        'latest_news': News.objects.for_language().defer_translations('content')[:3],
+        'services': Service.objects.for_language()[:4],
     }
-    return render(request, 'main/team_list.html', context)
 
 
-def labs(request):
-    return render(request, 'main/labs.html')
+def team_paginator():
+    members = TeamMember.objects.for_language().defer_translations('bio').filter(is_visible=True)
+    return KeysetPaginator(members, TEAM_ORDERING, TEAM_PAGE_SIZE)
 
 
-def project_list(request, category_slug):
+def news_paginator():
+    news = News.objects.for_language().defer_translations('content')
+    return KeysetPaginator(news, NEWS_ORDERING, NEWS_PAGE_SIZE)
+
+
+def category_name(category_slug):
     category_map = {
         'research': _('Научные исследования'),
         'development': _('Проекты в разработке'),
         'commercial': _('Коммерциализация')
     }
-    category_name = category_map.get(category_slug, _('Проекты'))
+    return category_map.get(category_slug, _('Проекты'))
+
+
+def project_list_queryset(category_slug):
+    return (
+        Project.objects.for_language()
+        .defer_translations(*PROJECT_BODY_FIELDS)
+        .filter(category=category_slug)
+        .prefetch_related(*PROJECT_LIST_PREFETCH)
+    )
+
+
+def project_detail_queryset():
+    return Project.objects.for_language().defer_rich_text_sources().prefetch_related(*project_detail_prefetch())
+
+
+def team_member_detail_queryset():
+    return TeamMember.objects.for_language().defer_rich_text_sources().prefetch_related(
+        'social_links',
+        Prefetch('publications', queryset=Publication.objects.for_language().defer_rich_text_sources()),
+    )
+
+
+def member_projects_queryset(member):
+    return member.projects.for_language().defer_translations(*PROJECT_BODY_FIELDS)
+
+
+def news_detail_queryset():
+    return News.objects.for_language().defer_rich_text_sources()
+
+
+# Отметки изменения для условного GET (conditional_page): один агрегатный запрос на выборку
+
+def index_stamp(request):
+    return ChangeStamp.combine(
+        change_stamp(TeamMember.objects.all()),
+        change_stamp(News.objects.all()),
+        change_stamp(Service.objects.all()),
+    )
+
+
+def team_list_stamp(request):
+    return change_stamp(TeamMember.objects.all())
+
+
+def project_list_stamp(request, category_slug):
+    # По всей таблице: проект, перенесённый в другую категорию, тоже меняет список
+    return change_stamp(Project.objects.all())
+
+
+def project_stamp(request, slug):
+    return change_stamp(Project.objects.filter(slug=slug), 'team', 'news')
+
+
+def team_member_stamp(request, slug):
+    return change_stamp(TeamMember.objects.filter(slug=slug), 'projects')
+
+
+def news_list_stamp(request):
+    return change_stamp(News.objects.all())
 
-    projects = Project.objects.filter(category=category_slug)
+
+def news_stamp(request, slug):
+    return change_stamp(News.objects.filter(slug=slug))
+
+
+def split_keywords(keywords):
+    if not keywords:
+        return []
+    return [keyword.strip() for keyword in keywords.split(',')]
+
+
+def search_query(request):
+    return request.GET.get('q', '').strip()[:SEARCH_QUERY_MAX_LENGTH]
+
+
+def page_params(request):
+    return {'after': request.GET.get('after'), 'before': request.GET.get('before')}
+
+
+@read_from_snapshot
+@conditional_page(index_stamp)
+@cache_page_per_language(TeamMember, News, Service)
+def index(request):
+    return render(request, 'main/index.html', index_querysets())
+
+
+@read_from_snapshot
+@conditional_page(team_list_stamp)
+def team_list(request):
     context = {
-        'projects': projects,
-        'category_name': category_name
+        'team_page': team_paginator().page(**page_params(request))
     }
-    return render(request, 'main/project_list.html', context)
+    return render(request, 'main/team_list.html', context)
 
 
-def project_detail(request, slug):
-    project = get_object_or_404(Project, slug=slug)
+@read_from_snapshot
+@conditional_page(team_list_stamp)
+def team_list_more(request):
+    page = team_paginator().page(**page_params(request))
+    response = render(request, 'main/includes/team_cards.html', {'team_page': page})
+    response['X-Next-Cursor'] = page.next_cursor or ''
+    return response
+
 
-    team_members = project.team.all()
+@read_from_snapshot
+def labs(request):
+    return render(request, 'main/labs.html')
 
-    keywords_list = []
-    if project.keywords:
-        keywords_list = [keyword.strip() for keyword in project.keywords.split(',')]
 
+@read_from_snapshot
+@conditional_page(project_list_stamp)
+def project_list(request, category_slug):
+    context = {
+        'projects': project_list_queryset(category_slug),
+        'category_name': category_name(category_slug)
+    }
+    return render(request, 'main/project_list.html', context)
+
+
+@read_from_snapshot
+@conditional_page(project_stamp)
+@cache_page_per_language(Project, ProjectFeature, ProjectTechStack, ProjectResultImage, TeamMember, Publication, News)
+def project_detail(request, slug):
+    project = get_object_or_404(project_detail_queryset(), slug=slug)
     context = {
         'project': project,
-        'team_members': team_members,
-        'keywords_list': keywords_list
+        'team_members': project.team.all(),
+        'keywords_list': split_keywords(project.keywords)
     }
     return render(request, 'main/project_detail.html', context)
 
 
+@read_from_snapshot
+@conditional_page(team_member_stamp)
+@cache_page_per_language(TeamMember, SocialLink, Publication, Project)
 def team_member_detail(request, slug):
-    member = get_object_or_404(TeamMember, slug=slug)
-    projects = member.projects.all()
+    member = get_object_or_404(team_member_detail_queryset(), slug=slug)
     context = {
         'member': member,
-        'projects': projects
+        'projects': member_projects_queryset(member)
     }
     return render(request, 'main/team_member_detail.html', context)
 
 
+@read_from_snapshot
+@conditional_page(news_list_stamp)
 def news_list(request):
-    all_news = News.objects.all()
     context = {
-        'all_news': all_news,
+        'news_page': news_paginator().page(**page_params(request)),
     }
     return render(request, 'main/news_list.html', context)
 
 
+@read_from_snapshot
+@conditional_page(news_list_stamp)
+def news_list_more(request):
+    page = news_paginator().page(**page_params(request))
+    response = render(request, 'main/includes/news_cards.html', {'news_page': page})
+    response['X-Next-Cursor'] = page.next_cursor or ''
+    return response
+
+
+@read_from_snapshot
+@conditional_page(news_stamp)
+@cache_page_per_language(News)
 def news_detail(request, slug):
-    news_item = get_object_or_404(News, slug=slug)
-    keywords_list = []
-    if news_item.keywords:
-        keywords_list = [keyword.strip() for keyword in news_item.keywords.split(',')]
+    news_item = get_object_or_404(news_detail_queryset(), slug=slug)
     context = {
         'news_item': news_item,
-        'keywords_list': keywords_list
+        'keywords_list': split_keywords(news_item.keywords)
     }
     return render(request, 'main/news_detail.html', context)
 
 
+@read_from_snapshot
+def search(request):
+    query = search_query(request)
+    context = {
+        'query': query,
+        'results': search_documents(query) if query else [],
+    }
+    return render(request, 'main/search.html', context)
+
+
 def send_telegram_message(request):
+    # Заявка только сохраняется в очередь, в Telegram её отправляет manage.py dispatch_outbox
     if request.method == 'POST':
         name = request.POST.get('name')
         phone = request.POST.get('phone')
@@ -104,29 +264,26 @@ def send_telegram_message(request):
         if not all([name, phone, email, message_body]):
             return JsonResponse({'success': False, 'error': _('Все поля обязательны для заполнения.')})
 
-        token = settings.TELEGRAM_BOT_TOKEN
-        chat_id = settings.TELEGRAM_CHAT_ID
-
-        text = (
-            f"<b>Новая заявка с сайта!</b>\n\n"
-            f"<b>Имя:</b> {name}\n"
-            f"<b>Телефон:</b> {phone}\n"
-            f"<b>Email:</b> {email}\n\n"
-            f"<b>Сообщение:</b>\n{message_body}"
-        )
-
-        async def send():
-            try:
-                bot = telegram.Bot(token=token)
-                await bot.send_message(
-                    chat_id=chat_id,
-                    text=text,
-                    parse_mode='HTML'
-                )
-                return JsonResponse({'success': True})
-            except telegram.error.TelegramError as e:
-                return JsonResponse({'success': False, 'error': f'Telegram Error: {e.message}'})
-
-        return asyncio.run(send())
-
-    return JsonResponse({'success': False, 'error': _('Неверный метод запроса.')})
\ No newline at end of file
+        ContactMessage.objects.create(name=name, phone=phone, email=email, message=message_body)
+        return JsonResponse({'success': True})
+
+    return JsonResponse({'success': False, 'error': _('Неверный метод запроса.')})
+
+
+@never_cache
+@ensure_csrf_cookie
+def csrf(request):
+    # В пререндеренных страницах (main/prerender.py) токена нет: static/js/script.js берёт его здесь
+    return JsonResponse({'token': get_token(request)})
+
+
+def metrics(request):
+    # Гистограммы всех воркеров в текстовом формате Prometheus (main.middleware.RequestMetricsMiddleware)
+    if settings.METRICS_TOKEN:
+        allowed = request.headers.get('Authorization') == f"Bearer {settings.METRICS_TOKEN}"
+    else:
+        allowed = request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(metrics_store.collect()),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,6 +2,9 @@
 
 source /var/www/digitalem_project/venv/bin/activate
 
+# Значения /metrics копятся по файлам воркеров: при перезапуске начинаем с нуля
+rm -rf "${METRICS_DIR:-/var/www/digitalem_project/metrics}"
+
 gunicorn --workers 3 \
   --bind unix:/var/www/digitalem_project/digitalem_project.sock \
   digitalem_project.wsgi:application
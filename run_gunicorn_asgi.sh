@@ -0,0 +1,13 @@
+#!/bin/bash
+
+source /var/www/digitalem_project/venv/bin/activate
+
+# Значения /metrics копятся по файлам воркеров: при перезапуске начинаем с нуля
+rm -rf "${METRICS_DIR:-/var/www/digitalem_project/metrics}"
+
+export ASYNC_VIEWS=True
+
+gunicorn --workers 3 \
+  --worker-class uvicorn_worker.UvicornWorker \
+  --bind unix:/var/www/digitalem_project/digitalem_project.sock \
+  digitalem_project.asgi:application
@@ -0,0 +1,5 @@
+#!/bin/bash
+
+source /var/www/digitalem_project/venv/bin/activate
+
+python manage.py dispatch_outbox
@@ -0,0 +1,15 @@
+/* Фильтр AutocompleteListFilter (main/admin.py): выбор в поле автодополнения открывает список с этим фильтром */
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(document).on('change', '.autocomplete-filter select', function() {
+        if (!this.value) {
+            return;
+        }
+        const filter = this.closest('.autocomplete-filter');
+        const query = new URLSearchParams(filter.dataset.queryString);
+        query.set(filter.dataset.lookup, this.value);
+        window.location.search = query.toString();
+    });
+}
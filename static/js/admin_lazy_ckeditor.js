@@ -0,0 +1,24 @@
+/* global CKEDITOR */
+/* LazyCKEditorWidget (main/admin.py): CKEditor создаётся при первом фокусе на поле, а не для всех полей сразу */
+'use strict';
+{
+    function initialise(textarea) {
+        textarea.setAttribute('data-processed', '1');
+        const plugins = JSON.parse(textarea.getAttribute('data-external-plugin-resources'));
+        for (const plugin of plugins) {
+            CKEDITOR.plugins.addExternal(plugin[0], plugin[1], plugin[2]);
+        }
+        const editor = CKEDITOR.replace(textarea.id, JSON.parse(textarea.getAttribute('data-config')));
+        editor.on('instanceReady', function() {
+            editor.focus();
+        });
+    }
+
+    document.addEventListener('focusin', function(event) {
+        const textarea = event.target;
+        if (textarea.matches('textarea[data-processed="lazy"]') && textarea.id.indexOf('__prefix__') === -1
+                && window.CKEDITOR) {
+            initialise(textarea);
+        }
+    });
+}
@@ -128,6 +128,27 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     }
 
+    // В страницах, собранных manage.py prerender, поля csrfmiddlewaretoken пустые:
+    // токен берётся из cookie, а если её ещё нет — с /csrf/ (она же ставит cookie)
+    let csrfTokenRequest = null;
+    const csrfToken = () => {
+        const cookieToken = getCookie('csrftoken');
+        if (cookieToken) return Promise.resolve(cookieToken);
+        if (!csrfTokenRequest) {
+            csrfTokenRequest = fetch('/csrf/', { credentials: 'same-origin' })
+                .then(response => response.json())
+                .then(data => data.token);
+        }
+        return csrfTokenRequest;
+    };
+
+    const emptyTokenInputs = document.querySelectorAll('input[name="csrfmiddlewaretoken"][value=""]');
+    if (emptyTokenInputs.length) {
+        csrfToken()
+            .then(token => emptyTokenInputs.forEach(input => { input.value = token; }))
+            .catch(error => console.error('Ошибка получения CSRF-токена:', error));
+    }
+
     const contactForm = document.getElementById('contact-form');
     if (contactForm) {
         contactForm.addEventListener('submit', async function (event) {
@@ -141,13 +162,15 @@ document.addEventListener('DOMContentLoaded', function () {
             submitBtn.disabled = true;
             if (submitText) submitText.textContent = '...';
 
-            const formData = new FormData(this);
-
             try {
+                const token = await csrfToken();
+                const formData = new FormData(this);
+                formData.set('csrfmiddlewaretoken', token);
+
                 const response = await fetch('/send-telegram/', {
                     method: 'POST',
                     body: formData,
-                    headers: { 'X-CSRFToken': getCookie('csrftoken') },
+                    headers: { 'X-CSRFToken': token },
                 });
 
                 const result = await response.json();
@@ -182,6 +205,35 @@ document.addEventListener('DOMContentLoaded', function () {
         observer.observe(section);
     });
 
+    document.querySelectorAll('[data-load-more]').forEach(button => {
+        const container = document.querySelector(button.dataset.target);
+        const nextLink = button.parentElement.querySelector('[data-next-link]');
+        if (!container) return;
+
+        button.addEventListener('click', async () => {
+            button.disabled = true;
+            try {
+                const response = await fetch(`${button.dataset.url}?after=${encodeURIComponent(button.dataset.cursor)}`);
+                if (!response.ok) throw new Error(response.statusText);
+
+                container.insertAdjacentHTML('beforeend', await response.text());
+
+                const nextCursor = response.headers.get('X-Next-Cursor');
+                if (nextCursor) {
+                    button.dataset.cursor = nextCursor;
+                    button.disabled = false;
+                    if (nextLink) nextLink.href = `?after=${encodeURIComponent(nextCursor)}`;
+                } else {
+                    button.remove();
+                    if (nextLink) nextLink.remove();
+                }
+            } catch (error) {
+                console.error('Ошибка загрузки:', error);
+                button.disabled = false;
+            }
+        });
+    });
+
     function showNotification(message, type = 'success') {
         console.log('Попытка показать уведомление:', message);
 
@@ -0,0 +1,25 @@
+// Сборка CSS для manage.py build_css (запускается из корня проекта).
+// Тема должна совпадать с main/templates/main/includes/tailwind_cdn.html (запасной вариант без сборки).
+module.exports = {
+    content: [
+        './main/templates/**/*.html',
+        './templates/**/*.html',
+        './static/js/**/*.js',
+        './main/**/*.py',
+    ],
+    theme: {
+        extend: {
+            colors: {
+                'digitalem-blue': '#1B4B82',
+                'digitalem-navy': '#0F2844',
+                'digitalem-light': '#4A90C8',
+                'digitalem-accent': '#2E6BA8',
+                'digitalem-gray': '#F8FAFC'
+            },
+            fontFamily: {
+                'sans': ['Inter', 'system-ui', 'sans-serif'],
+                'mono': ['JetBrains Mono', 'monospace']
+            }
+        }
+    }
+}